@@ -0,0 +1,268 @@
+"""Persistent cache of document snapshots, keyed by file identity."""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from . import constants as c
+from .docx_reader import Block
+from .snapshot import SNAPSHOT_VERSION, DocumentSnapshot, build_snapshot
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    key TEXT PRIMARY KEY,
+    content_hash TEXT,
+    data TEXT NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_last_used ON snapshots (last_used);
+"""
+
+# Evict down to this share of max_bytes so eviction does not run on every insert
+_EVICT_TARGET = 0.9
+
+
+def default_cache_path() -> str:
+    """Get the per-user location of the cache database."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, c.CACHE_DIR_NAME, c.CACHE_FILE_NAME)
+
+
+def hash_file(filepath: str) -> str:
+    """Hash the bytes of a file."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(snapshot: DocumentSnapshot) -> str:
+    return json.dumps({
+        'path': snapshot.path,
+        'blocks': [list(block) for block in snapshot.blocks],
+        'preview': snapshot.preview,
+        'metadata': snapshot.metadata,
+    }, ensure_ascii=False)
+
+
+def _decode(data: str, filepath: str) -> DocumentSnapshot:
+    raw = json.loads(data)
+    blocks = [Block(*block) for block in raw['blocks']]
+    # The file may have been moved or renamed since it was cached
+    return DocumentSnapshot(filepath, blocks, raw['preview'], raw['metadata'])
+
+
+class ExtractionCache:
+    """SQLite-backed snapshot cache with size-bounded LRU eviction.
+
+    Entries are keyed by (device, inode, size, mtime_ns) plus the extraction
+    limits, so an unchanged file is found again even after being renamed.
+    All entries are dropped when SNAPSHOT_VERSION changes. If the database
+    cannot be opened the cache stays empty and every call parses the file.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: int = c.CACHE_MAX_BYTES,
+        hash_content: bool = c.CACHE_HASH_CONTENT
+    ):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._total = 0
+        self._db: Optional[sqlite3.Connection] = None
+        try:
+            self._db = self._open()
+        except (OSError, sqlite3.Error):
+            self._db = None
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            with db:
+                row = db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+                if row is None or row[0] != str(SNAPSHOT_VERSION):
+                    db.execute("DELETE FROM snapshots")
+                    db.execute(
+                        "INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)",
+                        (str(SNAPSHOT_VERSION),),
+                    )
+            self._total = db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM snapshots").fetchone()[0]
+        except sqlite3.Error:
+            db.close()
+            raise
+        return db
+
+    @staticmethod
+    def _key(st: os.stat_result, line_limit: Optional[int], preview_chars: int) -> str:
+        return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{line_limit or 0}:{preview_chars}"
+
+    def get(
+        self,
+        filepath: str,
+        line_limit: Optional[int] = None,
+        preview_chars: int = c.MAX_CONTENT_CHARS
+    ) -> Optional[DocumentSnapshot]:
+        """Look up a file, None on a miss."""
+        if self._db is None:
+            return None
+        key = self._key(os.stat(filepath), line_limit, preview_chars)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash, data FROM snapshots WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        content_hash, data = row
+        if self.hash_content and content_hash != hash_file(filepath):
+            return None
+        self._touch(key)
+        return _decode(data, filepath)
+
+    def put(
+        self,
+        snapshot: DocumentSnapshot,
+        st: os.stat_result,
+        line_limit: Optional[int] = None,
+        preview_chars: int = c.MAX_CONTENT_CHARS
+    ) -> None:
+        """Store a snapshot under the identity the file had before parsing."""
+        if self._db is None:
+            return
+        key = self._key(st, line_limit, preview_chars)
+        content_hash = hash_file(snapshot.path) if self.hash_content else None
+        data = _encode(snapshot)
+        nbytes = len(key) + len(data.encode("utf-8"))
+        with self._lock:
+            try:
+                with self._db:
+                    old = self._db.execute(
+                        "SELECT nbytes FROM snapshots WHERE key = ?", (key,)
+                    ).fetchone()
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO snapshots "
+                        "(key, content_hash, data, nbytes, last_used) VALUES (?, ?, ?, ?, ?)",
+                        (key, content_hash, data, nbytes, time.time()),
+                    )
+                self._total += nbytes - (old[0] if old else 0)
+                if self._total > self.max_bytes:
+                    self._evict()
+            except sqlite3.Error:
+                pass
+
+    def snapshot(
+        self,
+        filepath: str,
+        line_limit: Optional[int] = None,
+        preview_chars: int = c.MAX_CONTENT_CHARS,
+        timeout: Optional[float] = None
+    ) -> DocumentSnapshot:
+        """Get a file's snapshot from the cache, parsing and storing it on a miss."""
+        cached = self.get(filepath, line_limit, preview_chars)
+        if cached is not None:
+            return cached
+        st = os.stat(filepath)
+        snapshot = build_snapshot(filepath, line_limit, preview_chars, timeout)
+        self.put(snapshot, st, line_limit, preview_chars)
+        return snapshot
+
+    def _touch(self, key: str) -> None:
+        with self._lock:
+            self._touched[key] = time.time()
+            if len(self._touched) >= c.CACHE_TOUCH_BATCH:
+                self._flush_touched()
+
+    def _flush_touched(self) -> None:
+        """Write pending access times in one transaction (lock held)."""
+        if not self._touched or self._db is None:
+            return
+        try:
+            with self._db:
+                self._db.executemany(
+                    "UPDATE snapshots SET last_used = ? WHERE key = ?",
+                    [(used, key) for key, used in self._touched.items()],
+                )
+        except sqlite3.Error:
+            pass
+        self._touched.clear()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until under budget (lock held)."""
+        self._flush_touched()
+        target = self.max_bytes * _EVICT_TARGET
+        doomed = []
+        freed = 0
+        for key, nbytes in self._db.execute(
+            "SELECT key, nbytes FROM snapshots ORDER BY last_used"
+        ):
+            if self._total - freed <= target:
+                break
+            doomed.append((key,))
+            freed += nbytes
+        with self._db:
+            self._db.executemany("DELETE FROM snapshots WHERE key = ?", doomed)
+        self._total -= freed
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        if self._db is None:
+            return
+        with self._lock:
+            self._touched.clear()
+            with self._db:
+                self._db.execute("DELETE FROM snapshots")
+            self._total = 0
+
+    def close(self) -> None:
+        """Write back access times and close the database."""
+        with self._lock:
+            if self._db is None:
+                return
+            self._flush_touched()
+            self._db.close()
+            self._db = None
+
+
+_shared_cache: Optional[ExtractionCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> ExtractionCache:
+    """Get the process-wide cache, opening it on first use."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ExtractionCache()
+        return _shared_cache
+
+
+@atexit.register
+def close_shared_cache() -> None:
+    """Close the process-wide cache."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is not None:
+            _shared_cache.close()
+            _shared_cache = None
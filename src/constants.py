@@ -7,7 +7,7 @@ WINDOW_SIZE = "1300x700"
 # Step instructions
 INSTRUCTION_TEXT = """Tool đổi tên tập tin
 1. Chọn thư mục chứa tập tin cần đổi tên
-2. Đợi tập tin tải lên (file doc cũ tải lâu hơn file docx) muốn đọc file doc phải có office cài trên máy
+2. Đợi tập tin tải lên (file .doc được đọc trực tiếp, không cần cài Office)
 3. Các lưu ý:
     - Tên tập tin sẽ thêm dấu ★ để phân biệt với tập tin chưa đổi tên
     - Tool sẽ không đổi tên các file đã có dấu ★
@@ -32,6 +32,14 @@ LOG_INFO = "[INFO]"
 LOG_ERROR = "[LỖI]"
 LOG_TIME_FORMAT = "%H:%M:%S"
 
+# Log files (written in batches by a background thread, see logs.py)
+LOG_FILE = "rename_log.txt"
+LOG_JSON_FILE = None  # e.g. "rename_log.jsonl" for one JSON object per line
+LOG_FILE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+LOG_LEVEL = "INFO"  # "DEBUG" also logs every scored paragraph
+LOG_CONSOLE_LEVEL = "WARNING"
+LOG_BATCH_SIZE = 256
+
 # Rename patterns
 PATTERN_AI = "AI Tóm Tắt"
 
@@ -54,12 +62,15 @@ Tóm tắt ngắn gọn nội dung sau trong 100 ký tự:
 # Column names
 ORIGINAL_NAME_COL = "Tên Gốc"
 NEW_NAME_COL = "Tên Mới"
+STATUS_COL = "Trạng Thái"
 # Column widths
 NAME_COL_WIDTH = 200
+STATUS_COL_WIDTH = 100
 
 # Button texts
 LOAD_DIR_BTN = "Chọn Thư Mục"
 APPLY_BTN = "Áp Dụng"
+UNDO_BTN = "Hoàn Tác"
 
 # Messages
 WARNING_SELECT_DIR = "⚠ Vui lòng chọn thư mục trước!"
@@ -68,14 +79,107 @@ NO_CHANGES_MESSAGE = "ℹ Không có thay đổi nào."
 ERROR_MESSAGE = "⚠ Đã xảy ra lỗi: {}"
 UNSUPPORTED_FILE = "(Định dạng không được hỗ trợ)"
 AI_ERROR = "⚠ Lỗi AI: {}"
+NOTHING_TO_UNDO = "ℹ Không có lần đổi tên nào để hoàn tác."
+UNDO_MESSAGE = "↶ Đã trả lại tên cũ cho {} tập tin tại: {}"
+RECOVERED_BATCH_MESSAGE = "↻ Lần đổi tên trước bị gián đoạn; đã đổi tên nốt {} tập tin tại: {} (nhấn Hoàn Tác để trả lại tên cũ)"
+RECOVERED_UNDO_MESSAGE = "↶ Lần hoàn tác trước bị gián đoạn; đã trả lại tên cũ cho {} tập tin nữa tại: {}"
 AI_WAITING = "⏳ Đang xử lý AI..."
 AI_SUCCESS = "✓ Đã tạo tên bằng AI"
 FILE_ERROR = "⚠ Lỗi đọc tập tin: {}"
+TIMED_OUT_ERROR = "⏱ Quá thời gian xử lý, đã bỏ qua: {}"
+
+# File statuses shown in the file list
+STATUS_OK = ""
+STATUS_READ_ERROR = "Lỗi đọc"
+STATUS_TIMED_OUT = "Quá thời gian"
 
 # Folder names
 RENAMED_FILES_DIR = "renamed_files"
 
+# Writing renamed files
+COPY_BUFFER_SIZE = 1024 * 1024  # Reads and writes when the kernel cannot copy
+COPY_KERNEL_CHUNK = 64 * 1024 * 1024  # Bytes per copy_file_range/sendfile call
+COPY_WORKERS = 4  # Files copied at once
+COPY_POLL_MS = 50  # How often the window picks up finished copies
+
+# How files reach renamed_files. Reflinks and hard links take no space for
+# the data; both become plain copies when the file system (or device) differs.
+OUTPUT_COPY = "copy"
+OUTPUT_REFLINK = "reflink"  # Copy-on-write clone (btrfs, XFS); independent of the original
+OUTPUT_HARDLINK = "hardlink"  # Same file under a second name; edits show in both
+OUTPUT_MODE = OUTPUT_REFLINK
+PLACE_MAX_ATTEMPTS = 100  # Names tried when other processes keep taking them
+PLAN_TEMP_PREFIX = ".rename-tmp-"  # Files parked while a rename cycle is broken
+PLAN_WORKERS = 4  # Threads per stage of a rename plan (helps on network shares)
+PLAN_MAX_STAGES = 8  # Longer chains are planned as park-everything-then-move
+
 MAX_FILENAME_LENGTH = 200
+NAME_MAX_BYTES = 255  # Bytes in one path component (UTF-8 on Linux)
+DUPLICATE_SUFFIX_BYTES = len(" (9999)")  # Kept free for handle_duplicate_name
+RENAMED_MARK = " ★"  # Appended to renamed files so they are skipped next time
+
+# Document types recognised in the header (upper case, as written in titles)
+DOCUMENT_TYPES = (
+    "QUYẾT ĐỊNH", "NGHỊ ĐỊNH", "NGHỊ QUYẾT", "THÔNG TƯ", "CHỈ THỊ", "CÔNG VĂN",
+    "THÔNG BÁO", "BÁO CÁO", "TỜ TRÌNH", "KẾ HOẠCH", "BIÊN BẢN", "HỢP ĐỒNG",
+    "THỎA THUẬN", "THOẢ THUẬN", "QUY CHẾ", "QUY ĐỊNH", "CAM KẾT", "BÁO GIÁ",
+    "GIẤY CHỨNG NHẬN", "GIẤY ĐỀ NGHỊ", "ĐƠN ĐỀ NGHỊ", "GIẤY ỦY QUYỀN", "GIẤY UỶ QUYỀN",
+)
+# Metadata: "Số: 12" with plain digits is a document number only in these opening paragraphs
+METADATA_HEADER_PARAGRAPHS = 6
+
+# Keyword matching
+KEYWORD_STRIP_DIACRITICS = False  # Also match "ve viec" against "về việc"
+
+# Paragraph scoring: weight of each feature in scoring.FEATURES
+SCORE_WEIGHTS = {
+    "uppercase": 1.0,
+    "max_font": 1.0,
+    "centered": 1.0,
+    "match_hits": 0.5,
+    "ignore_hits": -0.5,
+    "font_ratio": 0.0,
+    "position": 0.0,
+}
+
+# Extraction workers
+EXTRACTION_POOL_SIZE = 2
+WORKER_MAX_DOCUMENTS = 200  # Recycle a worker after this many files
+WORKER_MAX_MEMORY_GROWTH = 512 * 1024 * 1024  # ...or once it has grown this much (bytes)
+WORKER_PING_TIMEOUT = 5  # seconds
+WORKER_PING_AFTER = 30  # Ping a worker idle this long (seconds) before reusing it
+WORKER_STOP_TIMEOUT = 5  # seconds
+EXTRACTION_TIMEOUT = 30  # seconds per file before its worker is killed
+EXTRACTION_MEMORY_LIMIT = 1024 * 1024 * 1024  # Address space cap per worker (bytes, not on Windows)
+MAX_FILE_SIZE = 100 * 1024 * 1024  # Larger files are skipped without being opened
+
+# Zip packages read through zip_reader (.docx; .xlsx is opened by openpyxl)
+ZIP_MAX_MEMBER_SIZE = 256 * 1024 * 1024  # Largest member we agree to inflate (bytes)
+ZIP_MAX_RATIO = 200  # Inflated/compressed ratio beyond which a member is treated as a bomb
+ZIP_RATIO_MIN_BYTES = 1024 * 1024  # Small members may compress well; only check the ratio past this
+
+# PDF extraction
+PDF_MAX_PAGES = 2  # Only these leading pages are ever loaded
+PDF_CENTER_TOLERANCE = 0.03  # Allowed margin difference, as a share of the page width
+
+# Spreadsheet extraction
+SHEET_MAX_ROWS = 20  # Non-empty rows read from the first sheet
+SHEET_DEFAULT_FONT_SIZE = 11  # Excel's default when a cell style has no size
+
+# Text file extraction
+TXT_HEAD_BYTES = 64 * 1024  # Nothing past this is ever read
+TXT_FONT_SIZE = 12  # Plain text has no sizes; every line gets this one
+
+# Extraction cache
+CACHE_DIR_NAME = "rename-app"
+CACHE_FILE_NAME = "extraction-cache.sqlite3"
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # Least recently used entries are evicted past this
+CACHE_HASH_CONTENT = False  # Also compare a hash of the file bytes, not only its identity
+CACHE_TOUCH_BATCH = 64  # Write access times back after this many cache hits
+
+# Rename journal (kept next to the cache)
+JOURNAL_FILE_NAME = "rename-journal.jsonl"
+JOURNAL_GROUP_COMMIT = 256  # Completed renames per fsync of the journal
 
 # Config file
 CONFIG_FILE = ".config"
@@ -84,6 +188,10 @@ CONFIG_FILE = ".config"
 SUPPORTED_EXTENSIONS = {
     '.docx': 'Tài liệu Word (*.docx)',
     '.doc': 'Tài liệu Word cũ (*.doc)',
+    '.pdf': 'Tài liệu PDF (*.pdf)',
+    '.xlsx': 'Bảng tính Excel (*.xlsx)',
+    '.xls': 'Bảng tính Excel cũ (*.xls)',
+    '.txt': 'Văn bản (*.txt)',
 }
 
 # Get formatted supported files text
@@ -96,9 +204,12 @@ MISSING_DEPS_MESSAGE = """
 Thiếu các thư viện cần thiết.
 Vui lòng cài đặt:
 
-Cho file .docx:
-    pip install python-docx
-
-Cho file .doc (Windows):
+File .docx và .doc được đọc trực tiếp, không cần cài thêm. Trên
+Windows, Word (pywin32) chỉ được dùng dự phòng cho file .doc không đọc được:
     pip install pywin32
+
+Tùy chọn, chỉ cần cho loại file tương ứng:
+    .pdf:  pip install PyMuPDF   (hoặc pdfplumber)
+    .xlsx: pip install openpyxl
+    .xls:  pip install xlrd
 """
\ No newline at end of file
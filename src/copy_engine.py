@@ -0,0 +1,216 @@
+"""Copy a batch of files on a pool of threads, letting the kernel move the bytes where it can."""
+
+import errno
+import os
+import shutil
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import constants as c
+from .names import NameRegistry
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# errno values meaning "this kind of kernel copy does not work for these two files"
+_UNSUPPORTED = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, errno.EPERM, errno.ENOTTY,
+    getattr(errno, "ENOTSUP", errno.EINVAL), getattr(errno, "EOPNOTSUPP", errno.EINVAL),
+    getattr(errno, "ENOTSOCK", errno.EINVAL),
+}
+
+# errno values meaning "this file system cannot hard-link"
+NO_LINK_ERRORS = {
+    errno.EPERM, errno.EXDEV, errno.EMLINK, errno.ENOSYS,
+    getattr(errno, "ENOTSUP", errno.EPERM), getattr(errno, "EOPNOTSUPP", errno.EPERM),
+}
+
+# Linux ioctl that makes dst share src's blocks (btrfs, XFS with reflink=1, ...)
+_FICLONE = 0x40049409
+
+
+def _kernel_copies() -> List[Callable[[int, int, int], int]]:
+    """Kernel-side copy calls available here, best first: (src fd, dst fd, count) -> bytes."""
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        # Same file system: may share blocks or copy inside the storage device
+        methods.append(lambda src, dst, count: os.copy_file_range(src, dst, count))
+    if hasattr(os, "sendfile") and os.name != "nt":
+        methods.append(lambda src, dst, count: os.sendfile(dst, src, None, count))
+    return methods
+
+
+_KERNEL_COPIES = _kernel_copies()
+
+
+def _copy_fds(src: int, dst: int) -> None:
+    """Copy from the current offset of src to its end.
+
+    Each kernel copy is tried in turn; one that refuses these files is
+    given up on before the first byte it would move, so the next method
+    (and in the end plain reads and writes) carries on from there. Like
+    shutil, a first call that moves nothing hands over to the next method
+    instead of ending the copy: files in procfs and some FUSE file
+    systems look empty to the kernel copies.
+    """
+    for method in _KERNEL_COPIES:
+        try:
+            if not method(src, dst, c.COPY_KERNEL_CHUNK):
+                continue
+            while method(src, dst, c.COPY_KERNEL_CHUNK):
+                pass
+            return
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+    while True:
+        data = os.read(src, c.COPY_BUFFER_SIZE)
+        if not data:
+            return
+        view = memoryview(data)
+        while view:
+            view = view[os.write(dst, view):]
+
+
+def _clone(src: int, dst: int) -> bool:
+    """Clone src's data into the empty dst; False where the file system cannot."""
+    if not FCNTL_AVAILABLE or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dst, _FICLONE, src)
+        return True
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED:
+            raise
+        return False
+
+
+def copy_file(src: str, dst: str, clone: bool = False) -> int:
+    """Copy src to dst with its metadata, like shutil.copy2; returns the size.
+
+    dst is created with O_EXCL, so FileExistsError is raised instead of
+    overwriting a file. dst is removed on any failure, including one to
+    copy the metadata. With clone, dst shares src's blocks (copy-on-write)
+    where the file system allows it and is copied otherwise.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    src_fd = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        dst_fd = os.open(dst, flags, 0o666)
+        try:
+            if not (clone and _clone(src_fd, dst_fd)):
+                _copy_fds(src_fd, dst_fd)
+            size = os.fstat(dst_fd).st_size
+            os.close(dst_fd)
+            dst_fd = None
+            shutil.copystat(src, dst)
+        except BaseException:
+            if dst_fd is not None:
+                os.close(dst_fd)
+            os.remove(dst)
+            raise
+    finally:
+        os.close(src_fd)
+    return size
+
+
+def reflink_file(src: str, dst: str) -> int:
+    """copy_file with clone: no extra space until either file is changed."""
+    return copy_file(src, dst, clone=True)
+
+
+def link_file(src: str, dst: str) -> int:
+    """Hard-link src as dst, copying instead across devices; returns the size.
+
+    Both names then refer to the same file, so a change through one shows
+    through the other. FileExistsError if dst exists.
+    """
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno not in NO_LINK_ERRORS:
+            raise
+        return copy_file(src, dst)
+    return os.stat(dst).st_size
+
+
+_OUTPUT_OPERATIONS: Dict[str, Callable[[str, str], int]] = {
+    c.OUTPUT_COPY: copy_file,
+    c.OUTPUT_REFLINK: reflink_file,
+    c.OUTPUT_HARDLINK: link_file,
+}
+
+
+def output_operation(mode: str) -> Callable[[str, str], int]:
+    """The function that writes one file in an output mode (c.OUTPUT_*)."""
+    try:
+        return _OUTPUT_OPERATIONS[mode]
+    except KeyError:
+        raise ValueError(f"Unknown output mode: {mode}") from None
+
+
+class CopyResult(NamedTuple):
+    """How one file of a batch went: the name it got, or the error."""
+    src: str
+    filename: str
+    size: int = 0
+    error: Optional[BaseException] = None
+
+
+def copy_files(
+    items: Sequence[Tuple[str, str]],
+    directory: str,
+    registry: NameRegistry,
+    workers: int = c.COPY_WORKERS,
+    on_progress: Optional[Callable[[CopyResult, int, int], None]] = None,
+    operation: Callable[[str, str], int] = copy_file
+) -> List[CopyResult]:
+    """Copy (source path, file name) pairs into directory, workers files at a time.
+
+    operation writes one file (copy_file, reflink_file, link_file).
+
+    File names should already be allocated in registry, the batch's
+    snapshot of directory; a name another process takes first is
+    recorded and the next "name (n)" is tried, PLACE_MAX_ATTEMPTS names
+    at most. The registry is only touched by the calling thread. on_progress gets
+    every finished file with the number done and the total. Results
+    come back in the order files finish.
+    """
+    pending = list(reversed(items))
+    total = len(pending)
+    results: List[CopyResult] = []
+    # future -> (source, name tried, name wanted, attempt)
+    running: Dict[Future, Tuple[str, str, str, int]] = {}
+
+    with ThreadPoolExecutor(max(workers, 1), thread_name_prefix="copy") as executor:
+
+        def submit(src: str, filename: str, wanted: str, attempt: int) -> None:
+            future = executor.submit(operation, src, os.path.join(directory, filename))
+            running[future] = (src, filename, wanted, attempt)
+
+        while pending or running:
+            # A few files queued per thread keeps every thread busy
+            # without holding the whole batch in the executor
+            while pending and len(running) < 2 * workers:
+                src, filename = pending.pop()
+                submit(src, filename, filename, 1)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                src, filename, wanted, attempt = running.pop(future)
+                error = future.exception()
+                if isinstance(error, FileExistsError) and attempt < c.PLACE_MAX_ATTEMPTS:
+                    registry.add(filename)
+                    retry = registry.allocate(*os.path.splitext(wanted))
+                    submit(src, retry, wanted, attempt + 1)
+                    continue
+                result = CopyResult(src, filename, 0 if error else future.result(), error)
+                results.append(result)
+                if on_progress is not None:
+                    on_progress(result, len(results), total)
+    return results
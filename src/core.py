@@ -1,22 +1,23 @@
+import logging
 import os
-import re
-from docx import Document
-import pprint
-import win32com.client  # Dùng để xử lý file .doc (Windows)
-from datetime import datetime
 
-# Logging function
-def log_operation(operation_type, filepath, new_name=None, error=None):
-    log_file = "rename_log.txt"
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    if operation_type == "ERROR":
-        log_entry = f"[{timestamp}] ERROR: {filepath} - {error}\n"
-    elif operation_type == "RENAME":
-        log_entry = f"[{timestamp}] RENAME: {filepath} -> {new_name}\n"
-    
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(log_entry)
+from . import constants as c
+from .keywords import compile_keywords
+from .metadata import extract_metadata
+from .names import scan_directory
+from .sanitize import clean_name, fit_name, strip_controls
+from .scoring import score_document
+from .snapshot import build_snapshot
+
+# Ghi log qua logs.setup_logging (ghi theo lô ở luồng nền)
+log = logging.getLogger(__name__)
+
+def log_error(filepath, error):
+    log.error("%s - %s", filepath, error, extra={"path": filepath, "error": str(error)})
+
+def log_rename(filepath, new_name):
+    log.info("%s -> %s", filepath, new_name,
+             extra={"event": "RENAME", "path": filepath, "new_name": new_name})
 
 def validate_file(filepath):
     if not os.path.exists(filepath):
@@ -32,9 +33,8 @@ def validate_file(filepath):
     if file_size == 0:
         raise ValueError(f"File is empty: {filepath}")
     
-    # 100MB limit
-    if file_size > 100 * 1024 * 1024:
-        raise ValueError(f"File too large (>100MB): {filepath}")
+    if file_size > c.MAX_FILE_SIZE:
+        raise ValueError(f"File too large (>{c.MAX_FILE_SIZE // (1024 * 1024)}MB): {filepath}")
 
 class TextParagraph:
     def __init__(self, text, font_size=None, is_centered=False):
@@ -68,156 +68,44 @@ def load_keywords(filepath):
         keywords = [line.strip() for line in f.readlines()]
     return keywords
 
-# Lấy font size lớn nhất từ dòng (paragraph)
-def get_max_font_size(paragraph):
-    max_font_size = 0
-    for run in paragraph.runs:
-        if run.font.size:  # Nếu có thông tin về kích thước font
-            max_font_size = max(max_font_size, run.font.size.pt)  # Lấy giá trị lớn nhất (pt)
-    return max_font_size
-
-def read_docx_paragraphs(filepath, line_limit=None):
-    doc = Document(filepath)
+def collect_paragraphs(blocks, line_limit=None):
+    # Lấy các đoạn từ trình đọc, dừng ngay khi đủ line_limit đoạn
     paragraphs = []
-    max_font_size_overall = 0
-    processed_count = 0
+    for block in blocks:
+        para = TextParagraph(
+            text=block.text,
+            font_size=block.font_size,
+            is_centered=block.is_centered
+        )
+        paragraphs.append(para)
 
-    # Calculate max font size first from both paragraphs and tables
-    for paragraph in doc.paragraphs:
-        max_font_size_overall = max(max_font_size_overall, get_max_font_size(paragraph))
-    
-    # Process paragraphs
-    for paragraph in doc.paragraphs:
-        text = paragraph.text.strip()
-        if text:  # Only process non-empty paragraphs
-            # Check if text is centered by comparing with centered version
-            is_centered = text == text.center(len(text))
-            font_size = get_max_font_size(paragraph)
-            
-            para = TextParagraph(
-                text=text,
-                font_size=font_size,
-                is_centered=is_centered
-            )
-            paragraphs.append(para)
-            
-            processed_count += 1
-            if line_limit and processed_count >= line_limit:
-                break
-    
-    processed_count = 0
-    # Process tables if we haven't hit the line limit
-    if not line_limit or processed_count < line_limit:
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    text = cell.text.strip()
-                    if text:
-                        # For table cells, we consider them centered if they're in the middle columns
-                        col_index = row._tr.xpath('./w:tc').index(cell._tc)
-                        is_centered = col_index > 0 and col_index < len(row.cells) - 1
-                        
-                        # Get font size from the first paragraph in the cell
-                        font_size = get_max_font_size(cell.paragraphs[0]) if cell.paragraphs else 0
-                        
-                        para = TextParagraph(
-                            text=text,
-                            font_size=font_size,
-                            is_centered=is_centered
-                        )
-                        paragraphs.append(para)
-                        
-                        processed_count += 2
-                        if line_limit and processed_count >= line_limit:
-                            break
-                if line_limit and processed_count >= line_limit:
-                    break
-            if line_limit and processed_count >= line_limit:
-                break
+        if line_limit and len(paragraphs) >= line_limit:
+            break
 
     return paragraphs
 
-def read_doc_paragraphs(filepath, line_limit=None):
-    try:
-        # Cố gắng tạo đối tượng Word nếu có Office
-        abs_path = os.path.abspath(filepath)
-        word = win32com.client.Dispatch("Word.Application")
-        word.Visible = False
-        word.DisplayAlerts = 0  # Tắt cảnh báo
-        doc = word.Documents.Open(abs_path, ReadOnly=True)
-        
-        paragraphs = []
-        processed_count = 0
-        
-        # Đọc từng đoạn văn bản
-        for p in doc.Paragraphs:
-            text = p.Range.Text.strip()
-            if text:  # Chỉ lấy các đoạn không rỗng
-                # Kiểm tra căn chỉnh đoạn văn (Alignment)
-                is_centered = (p.Alignment == 1)  # 1 tương ứng với căn giữa (wdAlignParagraphCenter)
-                
-                para = TextParagraph(
-                    text=text,
-                    font_size=p.Range.Font.Size,
-                    is_centered=is_centered
-                )
-                paragraphs.append(para)
-                
-                processed_count += 1
-                if line_limit and processed_count >= line_limit:
-                    break
-        
-        doc.Close()
-        word.Quit()
-        
-        return paragraphs
-    
-    except ImportError:
-        print("❌ Không thể import win32com.client. Đảm bảo rằng Microsoft Office đã được cài đặt.")
-    
-    except Exception as e:
-        print(f"❌ Lỗi khi mở file .doc: {e}")
-
 def clean_filename(filename):
-    filename = re.sub(r'[\x00-\x1F]', '', filename)
-    return re.sub(r'[<>:"/\\|?*\n\r\t\f\v]', '', filename).strip()
-
-def process_text(paragraphs, match_keywords, ignore_keywords, **kwargs):
-    # Find max font size
-    max_font_size = max((p.font_size or 0) for p in paragraphs)
+    return clean_name(filename)
 
-    # Score all paragraphs
-    for para in paragraphs:
-        # Check match and ignore keywords
-        for keyword in match_keywords:
-            if para.matches_keyword(keyword):
-                para.add_points(0.5)
-        for keyword in ignore_keywords:
-            if para.matches_keyword(keyword):
-                para.add_points(-0.5)
-        
-        # Check uppercase
-        if para.is_uppercase:
-            para.add_points(1)
-        
-        # Check max font size
-        if para.has_max_font_size(max_font_size):
-            para.add_points(1)
-        
-        # Check centering
-        if para.is_centered:
-            para.add_points(1)
+def process_text(paragraphs, match_keywords, ignore_keywords, weights=None, extension="", length_limit=200, **kwargs):
+    # Danh sách từ khóa được biên dịch một lần, mỗi đoạn chỉ quét một lượt
+    match_matcher = compile_keywords(tuple(match_keywords))
+    ignore_matcher = compile_keywords(tuple(ignore_keywords))
 
-    # Convert to list of dictionaries for printing AFTER scoring
-    lines_data = [p.to_dict() for p in paragraphs]
-    lines_data.sort(key=lambda x: x['points'], reverse=True)  # Sort by points
-    pprint.pprint(lines_data) # show all lines with points
+    # Score all paragraphs (chữ hoa, cỡ chữ lớn nhất, căn giữa, từ khóa - xem c.SCORE_WEIGHTS)
+    scores = score_document(paragraphs, match_matcher, ignore_matcher, weights)
+    for para, score in zip(paragraphs, scores):
+        para.add_points(score)
 
     # Sort paragraphs by points and get top 3
     sorted_paras = sorted(paragraphs, key=lambda p: p.points, reverse=True)
     top_texts = [clean_filename(p.text) for p in sorted_paras[:3]]
 
-    print(f"Top texts: {top_texts}")  # Debugging output
+    # Chỉ in điểm từng đoạn khi bật DEBUG
+    if log.isEnabledFor(logging.DEBUG):
+        for p in sorted_paras:
+            log.debug("%s điểm: %s", p.points, p.text, extra={"paragraph": p.to_dict()})
+        log.debug("Top texts: %s", top_texts)
 
     while len(top_texts) < 3:  # Ensure we have 3 items even if null
         top_texts.append("")
@@ -230,10 +118,10 @@ def process_text(paragraphs, match_keywords, ignore_keywords, **kwargs):
         return None
     
     
-    # Find year if present
-    all_text = "\n".join(p.text for p in paragraphs)
-    year_match = re.search(r"\b(20\d{2})\b", all_text)
-    year_str = f" {year_match.group(1)}" if year_match else ""
+    # Năm: ưu tiên ngày ban hành, rồi số văn bản, rồi năm đầu tiên gặp
+    metadata = extract_metadata(p.text for p in paragraphs)
+    log.debug("Metadata: %s", metadata)
+    year_str = f" {metadata.year.value}" if metadata.year else ""
 
     def create_filename(main, secondary_texts):
         # Join secondary texts with separator
@@ -244,112 +132,95 @@ def process_text(paragraphs, match_keywords, ignore_keywords, **kwargs):
     main_text = top_texts[0]
     secondary_texts = top_texts[1:3]
     
-    # Create initial filename and clean invalid chars
+    # Create initial filename; cắt theo số byte để vừa giới hạn tên file (255 byte)
     filename = create_filename(main_text, secondary_texts)
-    filename = filename[:200] + " ★"
+    filename = fit_name(filename, extension, c.RENAMED_MARK, max_chars=length_limit)
 
     return filename
 
 def clean_text(text):
-    # Remove control characters but keep newlines and tabs
-    return re.sub(r'[^\x20-\x7E\n\t]', '', text)
+    # Remove control characters but keep newlines and tabs (và giữ tiếng Việt)
+    return strip_controls(text)
 
-def get_unique_filename(base_path):
-    """Get unique filename by adding (1), (2), etc. if file exists"""
-    if not os.path.exists(base_path):
-        return base_path
-        
+def get_unique_filename(base_path, registry=None):
+    """Get unique filename by adding (1), (2), etc. if file exists
+
+    registry: tên đã có trong thư mục (names.scan_directory); dùng chung cho
+    cả lô để không phải stat từng tên. Tên trả về được giữ chỗ trong registry.
+    """
     directory = os.path.dirname(base_path)
-    filename = os.path.basename(base_path)
-    name, ext = os.path.splitext(filename)
-    
-    counter = 1
-    while os.path.exists(base_path):
-        new_name = f"{name} ({counter}){ext}"
-        base_path = os.path.join(directory, new_name)
-        counter += 1
-    
-    return base_path
+    if registry is None:
+        registry = scan_directory(directory or ".")
+    name, ext = os.path.splitext(os.path.basename(base_path))
+    return os.path.join(directory, registry.allocate(name, ext))
 
-def rename_file_with_rules(filepath, match_keywords, ignore_keywords, line_limit=None, length_limit=200):
+def rename_file_with_rules(filepath, match_keywords, ignore_keywords, line_limit=None, length_limit=200, snapshot=None, registry=None):
     # Validate input file
     if not os.path.exists(filepath):
-        log_operation("ERROR", filepath, error="File not found")
-        print(f"❌ Lỗi: File not found: {filepath}")
+        log_error(filepath, "File not found")
         return None
         
     file_extension = os.path.splitext(filepath)[1].lower()
     
     # Validate file extension
-    if file_extension not in [".doc", ".docx"]:
-        log_operation("ERROR", filepath, error="Unsupported file format")
-        print(f"❌ Lỗi: Unsupported file format: {filepath}")
+    if file_extension not in c.SUPPORTED_EXTENSIONS:
+        log_error(filepath, "Unsupported file format")
         return None
     
     try:
-        # Read file content
-        if file_extension == ".docx":
-            paragraphs = read_docx_paragraphs(filepath, line_limit)
-            print(f"✅ Đọc file .docx thành công: {filepath}")
-        else:
-            paragraphs = read_doc_paragraphs(filepath, line_limit)
-            print(f"✅ Đọc file .doc thành công: {filepath}")
+        # Read file content (dùng lại bản đã phân tích nếu có)
+        if snapshot is None:
+            validate_file(filepath)
+            # Đọc đủ đoạn để chấm điểm và xem trước
+            snapshot = build_snapshot(filepath, line_limit)
+        paragraphs = collect_paragraphs(snapshot.blocks, line_limit)
+        log.debug("Đọc file %s thành công: %s", file_extension, filepath)
             
         if not paragraphs:
-            log_operation("ERROR", filepath, error="No content found in file")
-            print(f"❌ Lỗi: No content found in: {filepath}")
+            log_error(filepath, "No content found in file")
             return None
             
     except Exception as e:
-        log_operation("ERROR", filepath, error=f"Failed to read file: {str(e)}")
-        print(f"❌ Lỗi khi đọc file: {str(e)}")
+        log_error(filepath, f"Failed to read file: {e}")
         return None
     
-    print(f"Đọc {len(paragraphs)} đoạn văn bản.")
+    log.debug("Đọc %d đoạn văn bản.", len(paragraphs))
     
     try:
         # Process text and generate new filename
-        new_filename = process_text(paragraphs, match_keywords, ignore_keywords, length_limit=length_limit)
+        new_filename = process_text(paragraphs, match_keywords, ignore_keywords,
+                                    extension=file_extension, length_limit=length_limit)
         if new_filename is None:
-            log_operation("ERROR", filepath, error="Failed to generate filename")
-            print(f"❌ Lỗi: Không thể tạo tên file mới.")
+            log_error(filepath, "Failed to generate filename")
             return None
         new_path = os.path.join(os.path.dirname(filepath), new_filename + file_extension)
         
         # Get unique filename if target exists
-        new_path = get_unique_filename(new_path)
-        
-        # Log rename operation before executing
-        log_operation("RENAME", filepath, os.path.basename(new_path))
+        new_path = get_unique_filename(new_path, registry)
         
-        try:
-            # Perform rename
-            # os.rename(filepath, new_path)
-            print(f"✅ Đổi tên file thành: {os.path.basename(new_path)}")
-            return new_path
-            
-        except Exception as e:
-            log_operation("ERROR", filepath, error=f"Failed to rename: {str(e)}")
-            print(f"❌ Lỗi khi đổi tên file: {str(e)}")
-            return None
+        # Chỉ đề xuất tên; RENAME được ghi khi tập tin thực sự được đổi tên
+        log.debug("Tên mới đề xuất: %s", os.path.basename(new_path))
+        return new_path
             
     except Exception as e:
-        log_operation("ERROR", filepath, error=f"Failed to process: {str(e)}")
-        print(f"❌ Lỗi khi xử lý file: {str(e)}")
+        log_error(filepath, f"Failed to process: {e}")
         return None
 
 # 🧪 Thử demo
-match_keywords = load_keywords("match.txt")  # Load từ khóa từ file match.txt
-ignore_keywords = load_keywords("ignore.txt")  # Load từ khóa cần loại bỏ từ ignore.txt
-
-# Process files
-pairs = []
-filenames = ["file/123.docx", 'file/image.doc']
-for filename in filenames:
-    result = rename_file_with_rules(filename, match_keywords, ignore_keywords,
-                                  line_limit=10, length_limit=200)
-    if result:
-        pairs.append([filename, result])
-
-# Output results in nested list format
-print(pairs)
+if __name__ == "__main__":
+    from .logs import setup_logging
+    setup_logging()
+    match_keywords = load_keywords("match.txt")  # Load từ khóa từ file match.txt
+    ignore_keywords = load_keywords("ignore.txt")  # Load từ khóa cần loại bỏ từ ignore.txt
+
+    # Process files
+    pairs = []
+    filenames = ["file/123.docx", 'file/image.doc']
+    for filename in filenames:
+        result = rename_file_with_rules(filename, match_keywords, ignore_keywords,
+                                      line_limit=10, length_limit=200)
+        if result:
+            pairs.append([filename, result])
+
+    # Output results in nested list format
+    print(pairs)
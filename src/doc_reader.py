@@ -0,0 +1,401 @@
+"""Read paragraphs from legacy Word 97-2003 (.doc) files without Word."""
+
+import bisect
+import re
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .docx_reader import Block
+from .ole_file import OleFile, OleStream
+
+WORD_IDENT = 0xA5EC
+MIN_NFIB = 0x00C0  # Word 97; Word 6/95 files use another FIB layout
+FKP_SIZE = 512
+DEFAULT_FONT_SIZE = 10.0
+NO_STYLE = 0x0FFF
+READ_CHUNK_CHARS = 4096
+
+# FibBase flags
+F_ENCRYPTED = 0x0100
+F_WHICH_TBL_STM = 0x0200
+
+# FibRgFcLcb97 entries we use
+FC_STSHF = 1
+FC_PLCF_BTE_CHPX = 12
+FC_PLCF_BTE_PAPX = 13
+FC_CLX = 33
+
+# Single property modifiers (sprm) we use
+SPRM_PJC80 = 0x2403
+SPRM_PJC = 0x2461
+SPRM_CHPS = 0x4A43
+SPRM_CISTD = 0x4A30
+SPRM_TDEF_TABLE = 0xD608
+SPRM_PCHG_TABS = 0xC615
+_SPRA_OPERAND_SIZES = {0: 1, 1: 1, 2: 2, 3: 4, 4: 2, 5: 2, 7: 3}
+
+JC_CENTER = 1
+
+# Style kinds
+STK_PARAGRAPH = 1
+STK_CHARACTER = 2
+
+# Paragraph and table-cell marks end a paragraph
+_MARK_RE = re.compile("[\r\x07]")
+FIELD_BEGIN = "\x13"
+FIELD_SEPARATOR = "\x14"
+FIELD_END = "\x15"
+_FIELD_CHARS = re.compile("[\x13\x14\x15]")
+_CHAR_MAP = str.maketrans({
+    "\x0b": "\n",  # line break
+    "\x0c": "\n",  # page / section break
+    "\x1e": "-",   # non-breaking hyphen
+    "\x1f": None,  # optional hyphen
+    "\x01": None,  # picture
+    "\x02": None,  # footnote reference
+    "\x05": None,  # annotation reference
+    "\x08": None,  # drawn object
+    "\xa0": " ",
+})
+
+
+def _u16(data: bytes, offset: int) -> int:
+    return struct.unpack_from("<H", data, offset)[0]
+
+
+def _u32(data: bytes, offset: int) -> int:
+    return struct.unpack_from("<I", data, offset)[0]
+
+
+def parse_sprms(grpprl: bytes) -> Dict[int, bytes]:
+    """Map sprm opcodes to operands; later sprms override earlier ones."""
+    sprms: Dict[int, bytes] = {}
+    pos = 0
+    end = len(grpprl)
+    while pos + 2 <= end:
+        opcode = _u16(grpprl, pos)
+        pos += 2
+        spra = opcode >> 13
+        if spra != 6:
+            size = _SPRA_OPERAND_SIZES[spra]
+        elif opcode == SPRM_TDEF_TABLE:
+            if pos + 2 > end:
+                break
+            size = _u16(grpprl, pos) + 1
+        elif opcode == SPRM_PCHG_TABS and pos < end and grpprl[pos] == 255:
+            # Rare variable layout; nothing after it matters to us
+            break
+        else:
+            if pos >= end:
+                break
+            size = grpprl[pos]
+            pos += 1
+        sprms[opcode] = grpprl[pos:pos + size]
+        pos += size
+    return sprms
+
+
+def _jc(sprms: Dict[int, bytes]) -> Optional[int]:
+    operand = sprms.get(SPRM_PJC) or sprms.get(SPRM_PJC80)
+    return operand[0] if operand else None
+
+
+def _half_points(sprms: Dict[int, bytes]) -> Optional[float]:
+    operand = sprms.get(SPRM_CHPS)
+    return _u16(operand, 0) / 2 if operand and len(operand) == 2 else None
+
+
+class Style:
+    """Formatting a style defines or inherits."""
+
+    def __init__(self, kind: int, base: int, font_size: Optional[float], jc: Optional[int]):
+        self.kind = kind
+        self.base = base
+        self.font_size = font_size
+        self.jc = jc
+
+
+def read_styles(data: bytes) -> Dict[int, Style]:
+    """Parse the STSH and resolve every style's size and alignment."""
+    styles: Dict[int, Style] = {}
+    cb_stshi = _u16(data, 0)
+    cstd = _u16(data, 2)
+    cb_std_base = _u16(data, 4)
+    pos = 2 + cb_stshi
+    for istd in range(cstd):
+        if pos + 2 > len(data):
+            break
+        cb_std = _u16(data, pos)
+        pos += 2
+        std = data[pos:pos + cb_std]
+        pos += cb_std
+        if len(std) < cb_std_base + 2:
+            continue
+
+        kind = _u16(std, 2) & 0x000F
+        base = _u16(std, 2) >> 4
+        cupx = _u16(std, 4) & 0x000F
+        # Skip the name: cch, cch UTF-16 chars, terminating null
+        upx_pos = cb_std_base + 2 + _u16(std, cb_std_base) * 2 + 2
+        upxs = []
+        for _ in range(cupx):
+            if upx_pos + 2 > len(std):
+                break
+            cb_upx = _u16(std, upx_pos)
+            upxs.append(std[upx_pos + 2:upx_pos + 2 + cb_upx])
+            upx_pos += 2 + cb_upx + (cb_upx & 1)
+
+        font_size = jc = None
+        if kind == STK_PARAGRAPH and len(upxs) == 2:
+            jc = _jc(parse_sprms(upxs[0][2:]))
+            font_size = _half_points(parse_sprms(upxs[1]))
+        elif kind == STK_CHARACTER and upxs:
+            font_size = _half_points(parse_sprms(upxs[0]))
+        styles[istd] = Style(kind, base, font_size, jc)
+
+    # Inherit unset values through istdBase
+    def inherited(istd: int, attr: str, seen: set):
+        style = styles.get(istd)
+        if style is None or istd in seen:
+            return None
+        value = getattr(style, attr)
+        if value is None and style.base != NO_STYLE:
+            seen.add(istd)
+            value = inherited(style.base, attr, seen)
+        return value
+
+    for istd, style in styles.items():
+        style.font_size = inherited(istd, "font_size", set())
+        style.jc = inherited(istd, "jc", set())
+    return styles
+
+
+class _FkpTable:
+    """Bin table (PlcBte) plus lazily parsed formatted disk pages."""
+
+    def __init__(self, word: OleStream, plc: bytes, parse_page):
+        count = (len(plc) - 4) // 8
+        self._word = word
+        self._fcs = list(struct.unpack_from(f"<{count + 1}I", plc, 0)) if count > 0 else [0]
+        self._pns = [pn & 0x3FFFFF for pn in struct.unpack_from(f"<{count}I", plc, 4 * (count + 1))]
+        self._parse_page = parse_page
+        self._pages: Dict[int, tuple] = {}
+
+    def page(self, index: int) -> tuple:
+        pn = self._pns[index]
+        if pn not in self._pages:
+            self._pages[pn] = self._parse_page(self._word.read(pn * FKP_SIZE, FKP_SIZE))
+        return self._pages[pn]
+
+    def page_index(self, fc: int) -> int:
+        return max(0, bisect.bisect_right(self._fcs, fc) - 1)
+
+    def __len__(self) -> int:
+        return len(self._pns)
+
+
+def _parse_papx_page(fkp: bytes) -> tuple:
+    """Return (rgfc, [(istd, sprms)]) of a PapxFkp."""
+    if len(fkp) < FKP_SIZE:
+        return [0], []
+    crun = fkp[FKP_SIZE - 1]
+    rgfc = list(struct.unpack_from(f"<{crun + 1}I", fkp, 0))
+    props = []
+    for i in range(crun):
+        offset = fkp[4 * (crun + 1) + 13 * i] * 2
+        if not offset:
+            props.append((0, {}))
+            continue
+        cb = fkp[offset]
+        if cb:
+            data = fkp[offset + 1:offset + 2 * cb]
+        else:
+            data = fkp[offset + 2:offset + 2 + 2 * fkp[offset + 1]]
+        props.append((_u16(data, 0) if len(data) >= 2 else 0, parse_sprms(data[2:])))
+    return rgfc, props
+
+
+def _parse_chpx_page(fkp: bytes) -> tuple:
+    """Return (rgfc, [sprms]) of a ChpxFkp."""
+    if len(fkp) < FKP_SIZE:
+        return [0], []
+    crun = fkp[FKP_SIZE - 1]
+    rgfc = list(struct.unpack_from(f"<{crun + 1}I", fkp, 0))
+    props = []
+    for i in range(crun):
+        offset = fkp[4 * (crun + 1) + i] * 2
+        props.append(parse_sprms(fkp[offset + 1:offset + 1 + fkp[offset]]) if offset else {})
+    return rgfc, props
+
+
+class DocReader:
+    """Rebuild paragraphs of a Word 97-2003 document through its piece table."""
+
+    def __init__(self, ole: OleFile):
+        self.word = ole.open_stream("WordDocument")
+        fib = self.word.read(0, 1024)
+        if len(fib) < 64 or _u16(fib, 0) != WORD_IDENT:
+            raise ValueError("Not a Word document")
+        if _u16(fib, 2) < MIN_NFIB:
+            raise ValueError("Word 6/95 documents are not supported")
+        flags = _u16(fib, 0x0A)
+        if flags & F_ENCRYPTED:
+            raise ValueError("Encrypted document")
+        self.table = ole.open_stream("1Table" if flags & F_WHICH_TBL_STM else "0Table")
+
+        csw = _u16(fib, 32)
+        lw_pos = 34 + csw * 2 + 2
+        cslw = _u16(fib, lw_pos - 2)
+        self.ccp_text = _u32(fib, lw_pos + 3 * 4)
+        fclcb_pos = lw_pos + cslw * 4 + 2
+
+        def fc_lcb(index: int) -> Tuple[int, int]:
+            return struct.unpack_from("<II", fib, fclcb_pos + index * 8)
+
+        self.pieces = self._read_pieces(self.table.read(*fc_lcb(FC_CLX)))
+        self.papx = _FkpTable(self.word, self.table.read(*fc_lcb(FC_PLCF_BTE_PAPX)), _parse_papx_page)
+        self.chpx = _FkpTable(self.word, self.table.read(*fc_lcb(FC_PLCF_BTE_CHPX)), _parse_chpx_page)
+        try:
+            self.styles = read_styles(self.table.read(*fc_lcb(FC_STSHF)))
+        except (struct.error, IndexError, KeyError):
+            self.styles = {}
+
+    @staticmethod
+    def _read_pieces(clx: bytes) -> List[Tuple[int, int, int, bool]]:
+        """Parse the Clx into (cp_start, cp_end, fc, compressed) pieces."""
+        pos = 0
+        while pos < len(clx):
+            if clx[pos] == 1:  # Prc: skip the property modifiers
+                pos += 3 + _u16(clx, pos + 1)
+            elif clx[pos] == 2:  # Pcdt: the piece table itself
+                lcb = _u32(clx, pos + 1)
+                plc = clx[pos + 5:pos + 5 + lcb]
+                count = (len(plc) - 4) // 12
+                cps = struct.unpack_from(f"<{count + 1}I", plc, 0)
+                pieces = []
+                for i in range(count):
+                    fc = _u32(plc, 4 * (count + 1) + 8 * i + 2)
+                    compressed = bool(fc & 0x40000000)
+                    fc &= 0x3FFFFFFF
+                    pieces.append((cps[i], cps[i + 1], fc // 2 if compressed else fc, compressed))
+                return pieces
+            else:
+                break
+        raise ValueError("Missing piece table")
+
+    def iter_raw_paragraphs(self) -> Iterator[Tuple[str, List[Tuple[int, int]], int]]:
+        """Yield (text, fc segments, paragraph mark fc) of the main text."""
+        text: List[str] = []
+        segments: List[Tuple[int, int]] = []
+        fields: List[bool] = []  # True while inside a field's code part
+
+        for cp_start, cp_end, fc, compressed in self.pieces:
+            cp_end = min(cp_end, self.ccp_text)
+            width = 1 if compressed else 2
+            encoding = "cp1252" if compressed else "utf-16-le"
+            for chunk_cp in range(cp_start, cp_end, READ_CHUNK_CHARS):
+                chunk_fc = fc + (chunk_cp - cp_start) * width
+                count = min(READ_CHUNK_CHARS, cp_end - chunk_cp)
+                chars = self.word.read(chunk_fc, count * width).decode(encoding, "replace")
+                begin = 0
+                for match in _MARK_RE.finditer(chars):
+                    end = match.start()
+                    self._append_text(text, fields, chars[begin:end])
+                    segments.append((chunk_fc + begin * width, chunk_fc + end * width))
+                    yield "".join(text), segments, chunk_fc + end * width
+                    text, segments = [], []
+                    begin = end + 1
+                if begin < len(chars):
+                    self._append_text(text, fields, chars[begin:])
+                    segments.append((chunk_fc + begin * width, chunk_fc + len(chars) * width))
+
+    @staticmethod
+    def _append_text(text: List[str], fields: List[bool], chars: str) -> None:
+        """Append visible characters, dropping field codes."""
+        if not fields and not _FIELD_CHARS.search(chars):
+            text.append(chars.translate(_CHAR_MAP))
+            return
+        for ch in chars:
+            if ch == FIELD_BEGIN:
+                fields.append(True)
+            elif ch == FIELD_SEPARATOR:
+                if fields:
+                    fields[-1] = False
+            elif ch == FIELD_END:
+                if fields:
+                    fields.pop()
+            elif not any(fields):
+                text.append(ch.translate(_CHAR_MAP))
+
+    def paragraph_properties(self, mark_fc: int) -> Tuple[int, Dict[int, bytes]]:
+        """Get (istd, sprms) of the paragraph ending at mark_fc."""
+        if not len(self.papx):
+            return 0, {}
+        rgfc, props = self.papx.page(self.papx.page_index(mark_fc))
+        index = bisect.bisect_right(rgfc, mark_fc) - 1
+        if 0 <= index < len(props):
+            return props[index]
+        return 0, {}
+
+    def _style(self, istd: int) -> Optional[Style]:
+        return self.styles.get(istd)
+
+    def is_centered(self, istd: int, sprms: Dict[int, bytes]) -> bool:
+        jc = _jc(sprms)
+        if jc is None:
+            style = self._style(istd)
+            jc = style.jc if style else None
+        return jc == JC_CENTER
+
+    def max_font_size(self, istd: int, segments: List[Tuple[int, int]]) -> float:
+        """Get the largest character size over the paragraph's text."""
+        style = self._style(istd)
+        paragraph_size = style.font_size if style and style.font_size else DEFAULT_FONT_SIZE
+        max_size = 0
+        for fc_start, fc_end in segments:
+            if fc_start >= fc_end:
+                continue
+            page_index = self.chpx.page_index(fc_start)
+            while page_index < len(self.chpx):
+                rgfc, props = self.chpx.page(page_index)
+                run = max(0, bisect.bisect_right(rgfc, fc_start) - 1)
+                while run < len(props) and rgfc[run] < fc_end:
+                    if rgfc[run + 1] > fc_start:
+                        max_size = max(max_size, self._run_size(props[run], paragraph_size))
+                    run += 1
+                if run < len(props) or rgfc[-1] >= fc_end:
+                    break
+                page_index += 1
+        return max_size or paragraph_size
+
+    def _run_size(self, sprms: Dict[int, bytes], paragraph_size: float) -> float:
+        size = _half_points(sprms)
+        if size is not None:
+            return size
+        istd = sprms.get(SPRM_CISTD)
+        if istd and len(istd) == 2:
+            style = self._style(_u16(istd, 0))
+            if style and style.font_size:
+                return style.font_size
+        return paragraph_size
+
+    def iter_blocks(self) -> Iterator[Block]:
+        for text, segments, mark_fc in self.iter_raw_paragraphs():
+            text = text.strip()
+            if not text:
+                continue
+            istd, sprms = self.paragraph_properties(mark_fc)
+            yield Block(
+                text=text,
+                font_size=self.max_font_size(istd, segments),
+                is_centered=self.is_centered(istd, sprms),
+            )
+
+
+def iter_blocks(filepath: str) -> Iterator[Block]:
+    """Yield non-empty paragraphs and table cells of a .doc in text order.
+
+    Parsing stops as soon as the caller stops iterating.
+    """
+    with OleFile(filepath) as ole:
+        yield from DocReader(ole).iter_blocks()
@@ -0,0 +1,297 @@
+"""Stream text blocks out of .docx files without building the whole document."""
+
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, List, NamedTuple, Optional
+
+from .docx_styles import W_NS, StyleIndex, load_style_index, parse_size
+from .zip_reader import ZipArchive
+
+REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+OFFICE_DOCUMENT_REL = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+)
+STYLES_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+DEFAULT_STYLES_PART = "word/styles.xml"
+
+# WordprocessingML tags
+P = W_NS + "p"
+R = W_NS + "r"
+T = W_NS + "t"
+TAB = W_NS + "tab"
+PTAB = W_NS + "ptab"
+BR = W_NS + "br"
+CR = W_NS + "cr"
+NO_BREAK_HYPHEN = W_NS + "noBreakHyphen"
+PPR = W_NS + "pPr"
+RPR = W_NS + "rPr"
+JC = W_NS + "jc"
+SZ = W_NS + "sz"
+P_STYLE = W_NS + "pStyle"
+R_STYLE = W_NS + "rStyle"
+TBL = W_NS + "tbl"
+TR = W_NS + "tr"
+TC = W_NS + "tc"
+TR_PR = W_NS + "trPr"
+TC_PR = W_NS + "tcPr"
+TBL_GRID = W_NS + "tblGrid"
+GRID_COL = W_NS + "gridCol"
+GRID_BEFORE = W_NS + "gridBefore"
+GRID_SPAN = W_NS + "gridSpan"
+V_MERGE = W_NS + "vMerge"
+H_MERGE = W_NS + "hMerge"
+VAL = W_NS + "val"
+
+# Elements that may wrap runs inside a paragraph
+_RUN_CONTAINERS = {
+    W_NS + "hyperlink",
+    W_NS + "ins",
+    W_NS + "moveTo",
+    W_NS + "smartTag",
+    W_NS + "fldSimple",
+    W_NS + "customXml",
+    W_NS + "sdt",
+    W_NS + "sdtContent",
+}
+
+_RUN_TEXT = {TAB: "\t", PTAB: "\t", BR: "\n", CR: "\n", NO_BREAK_HYPHEN: "-"}
+
+
+class Block(NamedTuple):
+    """A non-empty paragraph or table cell in body order."""
+    text: str
+    font_size: float
+    is_centered: bool
+
+
+def _iter_runs(parent: ET.Element) -> Iterator[ET.Element]:
+    """Yield the runs of a paragraph, including those inside hyperlinks etc."""
+    for child in parent:
+        if child.tag == R:
+            yield child
+        elif child.tag in _RUN_CONTAINERS:
+            yield from _iter_runs(child)
+
+
+def paragraph_text(p: ET.Element) -> str:
+    """Get the visible text of a paragraph."""
+    parts = []
+    for run in _iter_runs(p):
+        for child in run:
+            if child.tag == T:
+                parts.append(child.text or "")
+            elif child.tag in _RUN_TEXT:
+                parts.append(_RUN_TEXT[child.tag])
+    return "".join(parts)
+
+
+def _style_id(props: Optional[ET.Element], tag: str) -> Optional[str]:
+    """Get the style reference (pStyle/rStyle) from a property element."""
+    if props is None:
+        return None
+    ref = props.find(tag)
+    return ref.get(VAL) if ref is not None else None
+
+
+def get_max_font_size(p: ET.Element, styles: StyleIndex) -> float:
+    """Get the largest effective run font size (pt) of a paragraph."""
+    paragraph_style = _style_id(p.find(PPR), P_STYLE)
+    max_font_size = 0
+    for run in _iter_runs(p):
+        rpr = run.find(RPR)
+        size = styles.run_size(
+            paragraph_style,
+            _style_id(rpr, R_STYLE),
+            parse_size(rpr.find(SZ)) if rpr is not None else None,
+        )
+        max_font_size = max(max_font_size, size)
+    return max_font_size
+
+
+def is_centered(p: ET.Element) -> bool:
+    """Check the paragraph's own justification."""
+    jc = p.find(f"{PPR}/{JC}")
+    return jc is not None and jc.get(VAL) == "center"
+
+
+class Cell(NamedTuple):
+    """A non-empty table cell with its position on the table grid."""
+    row: int
+    col: int
+    span: int
+    text: str
+    size: float
+
+
+def _int_val(elem: Optional[ET.Element], default: int) -> int:
+    """Read a w:val integer attribute."""
+    if elem is None:
+        return default
+    val = elem.get(VAL, "")
+    return int(val) if val.isdigit() else default
+
+
+def _iter_row_cells(parent: ET.Element) -> Iterator[ET.Element]:
+    """Yield the cells of a row, including those inside content controls."""
+    for child in parent:
+        if child.tag == TC:
+            yield child
+        elif child.tag in _RUN_CONTAINERS:
+            yield from _iter_row_cells(child)
+
+
+def _is_merge_continuation(tcpr: Optional[ET.Element]) -> bool:
+    """Check whether a cell only continues a merge started elsewhere."""
+    if tcpr is None:
+        return False
+    for tag in (V_MERGE, H_MERGE):
+        merge = tcpr.find(tag)
+        if merge is not None and merge.get(VAL, "continue") == "continue":
+            return True
+    return False
+
+
+class TableWalker:
+    """Walk the rows of one table, one pass per row.
+
+    Column indices come from a running sum of grid spans, so each cell is
+    placed in O(1). Cells that only continue a vertical or legacy
+    horizontal merge are skipped, so a merged cell is yielded once.
+    """
+
+    def __init__(self, styles: StyleIndex):
+        self.styles = styles
+        self.grid_cols = 0
+        self.row_index = 0
+
+    def set_grid(self, tbl_grid: ET.Element) -> None:
+        """Take the column count from w:tblGrid."""
+        self.grid_cols = sum(1 for col in tbl_grid if col.tag == GRID_COL)
+
+    def cells(self, tr: ET.Element) -> Iterator[Cell]:
+        """Yield the cells of one row."""
+        trpr = tr.find(TR_PR)
+        col = _int_val(trpr.find(GRID_BEFORE) if trpr is not None else None, 0)
+        placed = []
+        for tc in _iter_row_cells(tr):
+            tcpr = tc.find(TC_PR)
+            span = max(1, _int_val(tcpr.find(GRID_SPAN) if tcpr is not None else None, 1))
+            placed.append((tc, tcpr, col, span))
+            col += span
+        # Malformed tables may have rows wider than their declared grid
+        self.grid_cols = max(self.grid_cols, col)
+
+        for tc, tcpr, col, span in placed:
+            if _is_merge_continuation(tcpr):
+                continue
+            cell_paragraphs = [p for p in tc if p.tag == P]
+            text = "\n".join(paragraph_text(p) for p in cell_paragraphs).strip()
+            if not text:
+                continue
+            size = max(get_max_font_size(p, self.styles) for p in cell_paragraphs)
+            yield Cell(self.row_index, col, span, text, size)
+        self.row_index += 1
+
+    def is_centered(self, cell: Cell) -> bool:
+        """Table cells count as centered when they sit in the middle columns."""
+        return 0 < cell.col and cell.col + cell.span < self.grid_cols
+
+
+def _iter_body(stream: IO[bytes], styles: StyleIndex) -> Iterator[Block]:
+    """Parse document.xml incrementally and yield top-level blocks."""
+    stack: List[ET.Element] = []
+    p_depth = 0
+    tbl_depth = 0
+    table = TableWalker(styles)
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            stack.append(elem)
+            if tag == P:
+                p_depth += 1
+            elif tag == TBL:
+                tbl_depth += 1
+                if tbl_depth == 1:
+                    table = TableWalker(styles)
+            continue
+
+        stack.pop()
+        if tag == P:
+            p_depth -= 1
+            if p_depth or tbl_depth:
+                continue
+            text = paragraph_text(elem).strip()
+            if text:
+                yield Block(text, get_max_font_size(elem, styles), is_centered(elem))
+        elif tag == TR:
+            if tbl_depth != 1:
+                continue
+            for cell in table.cells(elem):
+                yield Block(cell.text, cell.size, table.is_centered(cell))
+        elif tag == TBL_GRID:
+            if tbl_depth == 1:
+                table.set_grid(elem)
+            continue
+        elif tag == TBL:
+            tbl_depth -= 1
+            if tbl_depth:
+                continue
+        else:
+            continue
+
+        # Drop finished blocks so memory stays flat on long documents
+        if stack:
+            stack[-1].remove(elem)
+
+
+def _find_related_part(
+    archive: ZipArchive,
+    source_part: str,
+    rel_type: str,
+    default: str
+) -> str:
+    """Resolve the target of a relationship of the given type."""
+    source_dir, source_name = posixpath.split(source_part)
+    rels_part = posixpath.join(source_dir, "_rels", source_name + ".rels")
+    try:
+        rels = ET.fromstring(archive.read(rels_part))
+    except (KeyError, ET.ParseError):
+        return default
+    for rel in rels.iter(REL_NS + "Relationship"):
+        if rel.get("Type") == rel_type:
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                return posixpath.normpath(target.lstrip("/"))
+            return posixpath.normpath(posixpath.join(source_dir, target))
+    return default
+
+
+def find_document_part(archive: ZipArchive) -> str:
+    """Resolve the main document part from the package relationships."""
+    return _find_related_part(archive, "", OFFICE_DOCUMENT_REL, DEFAULT_DOCUMENT_PART)
+
+
+def read_style_index(archive: ZipArchive, document_part: str) -> StyleIndex:
+    """Load the (cached) style index of the document's styles part."""
+    styles_part = _find_related_part(archive, document_part, STYLES_REL, DEFAULT_STYLES_PART)
+    try:
+        data = archive.read(styles_part)
+    except KeyError:
+        data = None
+    return load_style_index(data)
+
+
+def iter_blocks(filepath: str) -> Iterator[Block]:
+    """Yield non-empty paragraphs and table cells of a .docx in body order.
+
+    Parsing stops as soon as the caller stops iterating, and parts other
+    than the document, its styles and their relationships are never
+    inflated.
+    """
+    with ZipArchive(filepath) as archive:
+        document_part = find_document_part(archive)
+        styles = read_style_index(archive, document_part)
+        with archive.open(document_part) as stream:
+            yield from _iter_body(stream, styles)
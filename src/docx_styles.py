@@ -0,0 +1,138 @@
+"""Resolve effective font sizes from a .docx style sheet."""
+
+import hashlib
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Dict, Optional
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Word's built-in size when neither styles nor defaults set one
+DEFAULT_FONT_SIZE = 10.0
+
+# Most documents share a handful of templates
+STYLE_CACHE_SIZE = 64
+
+_STYLE = W_NS + "style"
+_STYLE_ID = W_NS + "styleId"
+_TYPE = W_NS + "type"
+_DEFAULT = W_NS + "default"
+_BASED_ON = W_NS + "basedOn"
+_RPR = W_NS + "rPr"
+_SZ = W_NS + "sz"
+_VAL = W_NS + "val"
+_RPR_DEFAULT_SZ = f"{W_NS}docDefaults/{W_NS}rPrDefault/{_RPR}/{_SZ}"
+
+_cache: "OrderedDict[bytes, StyleIndex]" = OrderedDict()
+
+
+def parse_size(sz: Optional[ET.Element]) -> Optional[float]:
+    """Convert a w:sz element (half-points) to points."""
+    if sz is None:
+        return None
+    val = sz.get(_VAL, "")
+    return int(val) / 2 if val.isdigit() else None
+
+
+class StyleIndex:
+    """Effective font size of every paragraph and character style."""
+
+    def __init__(
+        self,
+        default_size: float = DEFAULT_FONT_SIZE,
+        paragraph_sizes: Optional[Dict[str, Optional[float]]] = None,
+        character_sizes: Optional[Dict[str, Optional[float]]] = None,
+        default_paragraph_style: Optional[str] = None
+    ):
+        self.default_size = default_size
+        self.paragraph_sizes = paragraph_sizes or {}
+        self.character_sizes = character_sizes or {}
+        self.default_paragraph_style = default_paragraph_style
+
+    def run_size(
+        self,
+        paragraph_style: Optional[str],
+        character_style: Optional[str],
+        direct_size: Optional[float]
+    ) -> float:
+        """Get the size a run is rendered with.
+
+        Direct formatting wins over the character style, which wins over
+        the paragraph style, which wins over the document defaults.
+        """
+        if direct_size is not None:
+            return direct_size
+        size = self.character_sizes.get(character_style)
+        if size is not None:
+            return size
+        size = self.paragraph_sizes.get(paragraph_style or self.default_paragraph_style)
+        if size is not None:
+            return size
+        return self.default_size
+
+
+def _resolve_sizes(raw: Dict[str, tuple]) -> Dict[str, Optional[float]]:
+    """Follow basedOn chains so every style maps to its inherited size."""
+    resolved: Dict[str, Optional[float]] = {}
+    for style_id in raw:
+        chain = []
+        current = style_id
+        size = None
+        while current in raw and current not in resolved and current not in chain:
+            chain.append(current)
+            based_on, size = raw[current]
+            if size is not None:
+                break
+            current = based_on
+        else:
+            size = resolved.get(current)
+        for item in chain:
+            resolved[item] = size
+    return resolved
+
+
+def build_style_index(data: bytes) -> StyleIndex:
+    """Parse styles.xml into a StyleIndex."""
+    root = ET.fromstring(data)
+    default_size = parse_size(root.find(_RPR_DEFAULT_SZ)) or DEFAULT_FONT_SIZE
+    raw: Dict[str, Dict[str, tuple]] = {"paragraph": {}, "character": {}}
+    default_paragraph_style = None
+
+    for style in root.iter(_STYLE):
+        style_type = style.get(_TYPE)
+        style_id = style.get(_STYLE_ID)
+        if style_type not in raw or not style_id:
+            continue
+        based_on = style.find(_BASED_ON)
+        raw[style_type][style_id] = (
+            based_on.get(_VAL) if based_on is not None else None,
+            parse_size(style.find(f"{_RPR}/{_SZ}")),
+        )
+        if style_type == "paragraph" and style.get(_DEFAULT) in ("1", "true", "on"):
+            default_paragraph_style = style_id
+
+    return StyleIndex(
+        default_size=default_size,
+        paragraph_sizes=_resolve_sizes(raw["paragraph"]),
+        character_sizes=_resolve_sizes(raw["character"]),
+        default_paragraph_style=default_paragraph_style,
+    )
+
+
+def load_style_index(data: Optional[bytes]) -> StyleIndex:
+    """Get the StyleIndex for a styles part, reusing one built for the same bytes."""
+    if not data:
+        return StyleIndex()
+    key = hashlib.sha1(data).digest()
+    index = _cache.get(key)
+    if index is not None:
+        _cache.move_to_end(key)
+        return index
+    try:
+        index = build_style_index(data)
+    except ET.ParseError:
+        index = StyleIndex()
+    _cache[key] = index
+    if len(_cache) > STYLE_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return index
@@ -0,0 +1,465 @@
+"""Run text extraction in long-lived worker processes."""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import constants as c
+from . import doc_reader, docx_reader, pdf_reader, txt_reader, xls_reader, xlsx_reader
+from .docx_reader import Block
+
+
+class ExtractionError(Exception):
+    """Raised when a worker fails to extract a file."""
+
+
+class ExtractionTimeout(ExtractionError):
+    """Raised when a file runs past its deadline or memory ceiling."""
+
+
+def take_blocks(
+    blocks: Iterable[Block],
+    line_limit: Optional[int] = None,
+    min_chars: int = 0
+) -> List[Block]:
+    """Read blocks until there are line_limit of them and at least min_chars of text.
+
+    Without a line_limit everything is read.
+    """
+    taken: List[Block] = []
+    chars = 0
+    iterator = iter(blocks)
+    try:
+        for block in iterator:
+            taken.append(block)
+            chars += len(block.text) + 1
+            if line_limit and len(taken) >= line_limit and chars >= min_chars:
+                break
+        return taken
+    finally:
+        # Stop streaming readers right away instead of at garbage collection
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+class ExtractionBackend:
+    """Interface for anything that turns a file into text blocks.
+
+    Backends are created inside worker processes, so they must be
+    constructible from a picklable factory (a module-level class is fine).
+    """
+
+    def start(self) -> None:
+        """Acquire expensive resources once per worker."""
+
+    def extract(
+        self,
+        filepath: str,
+        line_limit: Optional[int] = None,
+        min_chars: int = 0
+    ) -> List[Block]:
+        """Return the leading non-empty blocks of a file (see take_blocks)."""
+        raise NotImplementedError
+
+    def ping(self) -> bool:
+        """Report whether the backend is still usable."""
+        return True
+
+    def close(self) -> None:
+        """Release what start() acquired."""
+
+
+class NativeBackend(ExtractionBackend):
+    """Pure-Python readers, no external application needed."""
+
+    READERS: Dict[str, Callable] = {
+        '.docx': docx_reader.iter_blocks,
+        '.doc': doc_reader.iter_blocks,
+        '.pdf': pdf_reader.iter_blocks,
+        '.xlsx': xlsx_reader.iter_blocks,
+        '.xls': xls_reader.iter_blocks,
+        '.txt': txt_reader.iter_blocks,
+    }
+
+    def extract(
+        self,
+        filepath: str,
+        line_limit: Optional[int] = None,
+        min_chars: int = 0
+    ) -> List[Block]:
+        ext = os.path.splitext(filepath)[1].lower()
+        reader = self.READERS.get(ext)
+        if reader is None:
+            raise ValueError(f"Unsupported file format: {filepath}")
+        return take_blocks(reader(filepath), line_limit, min_chars)
+
+
+class WordComBackend(ExtractionBackend):
+    """One Word instance per worker, reused for every document (Windows)."""
+
+    def start(self) -> None:
+        import pythoncom
+        import win32com.client
+        pythoncom.CoInitialize()
+        self.word = win32com.client.DispatchEx("Word.Application")
+        self.word.Visible = False
+        self.word.DisplayAlerts = 0  # Tắt cảnh báo
+
+    @staticmethod
+    def _iter_paragraphs(doc):
+        for p in doc.Paragraphs:
+            text = p.Range.Text.strip()
+            if text:
+                # 1 tương ứng với căn giữa (wdAlignParagraphCenter)
+                yield Block(text, p.Range.Font.Size, p.Alignment == 1)
+
+    def extract(
+        self,
+        filepath: str,
+        line_limit: Optional[int] = None,
+        min_chars: int = 0
+    ) -> List[Block]:
+        doc = self.word.Documents.Open(
+            os.path.abspath(filepath), ReadOnly=True, AddToRecentFiles=False
+        )
+        try:
+            return take_blocks(self._iter_paragraphs(doc), line_limit, min_chars)
+        finally:
+            doc.Close(False)
+
+    def ping(self) -> bool:
+        return bool(self.word.Version)
+
+    def close(self) -> None:
+        import pythoncom
+        try:
+            self.word.Quit()
+        finally:
+            pythoncom.CoUninitialize()
+
+
+def _rss_bytes() -> int:
+    """Resident memory of the current process, 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _limit_memory(max_bytes: Optional[int]) -> None:
+    """Cap the address space of the current process where the OS allows it."""
+    if not max_bytes:
+        return
+    try:
+        import resource
+    except ImportError:
+        # Windows: only the deadline applies
+        return
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            max_bytes = min(max_bytes, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _worker_main(
+    conn,
+    backend_factory: Callable[[], ExtractionBackend],
+    memory_limit: Optional[int] = None
+) -> None:
+    """Serve extraction requests until told to stop."""
+    _limit_memory(memory_limit)
+    backend = backend_factory()
+    backend.start()
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            command = message[0]
+            if command == "stop":
+                break
+            try:
+                if command == "ping":
+                    result = backend.ping()
+                else:
+                    _, filepath, line_limit, min_chars = message
+                    result = backend.extract(filepath, line_limit, min_chars)
+                conn.send(("ok", result, _rss_bytes()))
+            except MemoryError:
+                # The heap may be in any state now; report and let the pool replace us
+                conn.send(("limit", "Memory limit exceeded", 0))
+                break
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}", _rss_bytes()))
+    finally:
+        backend.close()
+
+
+class Worker:
+    """Parent-side handle of one worker process."""
+
+    def __init__(
+        self,
+        backend_factory: Callable[[], ExtractionBackend],
+        memory_limit: Optional[int] = None
+    ):
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, backend_factory, memory_limit),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.documents = 0
+        self.baseline_rss: Optional[int] = None
+        self.rss = 0
+        self.idle_since = time.monotonic()
+
+    def call(self, message: tuple, timeout: Optional[float] = None) -> Tuple[str, object]:
+        """Send one request and wait for its reply."""
+        self.conn.send(message)
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"Worker did not answer within {timeout}s")
+        status, payload, rss = self.conn.recv()
+        self.rss = rss
+        if self.baseline_rss is None:
+            self.baseline_rss = rss
+        return status, payload
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(("stop",))
+        except (OSError, EOFError):
+            pass
+        self.process.join(c.WORKER_STOP_TIMEOUT)
+        self.kill()
+
+    def kill(self) -> None:
+        """Terminate the process without waiting for it to finish its work."""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """Pool of long-lived extraction workers.
+
+    Workers are started on demand up to size and reused across files.
+    A worker is replaced after max_documents files, when its memory has
+    grown by more than max_memory_growth bytes, or when it stops
+    answering: a worker idle for more than WORKER_PING_AFTER seconds is
+    pinged before it is handed out. Each worker's address space is
+    capped at memory_limit bytes where the OS supports it; a worker that
+    hits the cap or runs past an extraction deadline is killed and
+    replaced.
+    """
+
+    def __init__(
+        self,
+        backend_factory: Callable[[], ExtractionBackend] = NativeBackend,
+        size: int = c.EXTRACTION_POOL_SIZE,
+        max_documents: int = c.WORKER_MAX_DOCUMENTS,
+        max_memory_growth: int = c.WORKER_MAX_MEMORY_GROWTH,
+        memory_limit: Optional[int] = c.EXTRACTION_MEMORY_LIMIT
+    ):
+        self.backend_factory = backend_factory
+        self.size = max(1, size)
+        self.max_documents = max_documents
+        self.max_memory_growth = max_memory_growth
+        self.memory_limit = memory_limit
+        self._idle: "queue.Queue[Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        # Notified whenever a worker goes idle, a slot frees up or the pool closes
+        self._available = threading.Condition(self._lock)
+        self._started = 0
+        self._closed = False
+
+    def _spawn(self) -> Optional[Worker]:
+        """Start a worker if the pool has room for one, else None.
+
+        The slot is reserved under the lock but the process is started
+        outside it, so other threads are not held up by the spawn.
+        """
+        with self._lock:
+            if self._closed:
+                raise ExtractionError("Worker pool is closed")
+            if self._started >= self.size:
+                return None
+            self._started += 1
+        try:
+            return Worker(self.backend_factory, self.memory_limit)
+        except BaseException:
+            with self._available:
+                self._started -= 1
+                self._available.notify()
+            raise
+
+    def _is_healthy(self, worker: Worker, max_idle: float = c.WORKER_PING_AFTER) -> bool:
+        """Whether worker is alive and, if idle longer than max_idle, answers a ping."""
+        if not worker.is_alive():
+            return False
+        if time.monotonic() - worker.idle_since < max_idle:
+            return True
+        try:
+            return worker.call(("ping",), c.WORKER_PING_TIMEOUT) == ("ok", True)
+        except (OSError, EOFError, TimeoutError):
+            return False
+
+    def _acquire(self) -> Worker:
+        while True:
+            with self._available:
+                while not self._closed and self._idle.empty() and self._started >= self.size:
+                    self._available.wait()
+                if self._closed:
+                    raise ExtractionError("Worker pool is closed")
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                # Another thread may take the free slot first; then wait again
+                worker = self._spawn()
+                if worker is None:
+                    continue
+                return worker
+            if self._is_healthy(worker):
+                return worker
+            # Its slot is free again, so the next round starts a replacement
+            self._discard(worker, kill=True)
+
+    def _discard(self, worker: Worker, kill: bool = False) -> None:
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        with self._available:
+            self._started -= 1
+            self._available.notify()
+
+    def _release(self, worker: Worker) -> None:
+        worker.documents += 1
+        grown = worker.rss - (worker.baseline_rss or worker.rss)
+        if (
+            self._closed
+            or worker.documents >= self.max_documents
+            or (self.max_memory_growth and grown > self.max_memory_growth)
+        ):
+            self._discard(worker)
+        else:
+            worker.idle_since = time.monotonic()
+            self._put_idle(worker)
+
+    def _put_idle(self, worker: Worker) -> None:
+        with self._available:
+            self._idle.put(worker)
+            self._available.notify()
+
+    def extract(
+        self,
+        filepath: str,
+        line_limit: Optional[int] = None,
+        min_chars: int = 0,
+        timeout: Optional[float] = None
+    ) -> List[Block]:
+        """Extract a file on the next free worker.
+
+        Raises ExtractionTimeout if the worker takes longer than timeout
+        seconds or runs out of memory; the worker is killed either way.
+        """
+        worker = self._acquire()
+        try:
+            status, payload = worker.call(("extract", filepath, line_limit, min_chars), timeout)
+        except TimeoutError:
+            self._discard(worker, kill=True)
+            raise ExtractionTimeout(f"Timed out after {timeout}s: {filepath}")
+        except (OSError, EOFError) as e:
+            self._discard(worker, kill=True)
+            raise ExtractionError(f"Worker crashed on {filepath}: {e!r}")
+        if status == "limit":
+            self._discard(worker, kill=True)
+            raise ExtractionTimeout(f"{payload}: {filepath}")
+        self._release(worker)
+        if status != "ok":
+            raise ExtractionError(payload)
+        return payload
+
+    def check_health(self) -> int:
+        """Ping every idle worker and replace the ones that do not answer.
+
+        Workers are also checked one at a time as they are handed out;
+        this checks them all at once, e.g. after the machine woke up.
+        Returns the number of workers that were replaced.
+        """
+        replaced = 0
+        for _ in range(self._idle.qsize()):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_healthy(worker, max_idle=0):
+                self._put_idle(worker)
+                continue
+            self._discard(worker, kill=True)
+            replacement = self._spawn()
+            if replacement is not None:
+                self._put_idle(replacement)
+            replaced += 1
+        return replaced
+
+    def close(self) -> None:
+        """Stop every idle worker; busy ones stop when released.
+
+        Threads waiting for a worker are woken and get ExtractionError.
+        """
+        with self._available:
+            self._closed = True
+            self._available.notify_all()
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(worker)
+
+
+_shared_pools: Dict[Callable, WorkerPool] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_pool(backend_factory: Callable[[], ExtractionBackend] = NativeBackend) -> WorkerPool:
+    """Get the process-wide pool for a backend, creating it on first use."""
+    with _shared_lock:
+        pool = _shared_pools.get(backend_factory)
+        if pool is None:
+            pool = _shared_pools[backend_factory] = WorkerPool(backend_factory)
+        return pool
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    """Stop all shared pools."""
+    with _shared_lock:
+        for pool in _shared_pools.values():
+            pool.close()
+        _shared_pools.clear()
@@ -1,66 +1,38 @@
 """Handle all file-related operations."""
 
 import os
-import shutil
-import re
 from pathlib import Path
-from typing import List, Tuple, Optional, Set, Dict
+from typing import List, Tuple, Optional, Dict
 
 from . import constants as c
 from . import ai_operations as ai
+from .names import NameRegistry, scan_directory
+from .copy_engine import copy_file, copy_files, output_operation
+from .sanitize import sanitize_filename
+from .snapshot import build_snapshot, make_preview
 
-# Optional imports for different file types
-try:
-    import docx
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-
-try:
-    import win32com.client
-    DOC_AVAILABLE = True
-except ImportError:
-    DOC_AVAILABLE = False
-
-
-def clean_filename(text: str) -> str:
-    """Convert text to valid filename."""
-    # Remove invalid filename characters
-    text = re.sub(r'[<>:"/\\|?*]', '', text)
-    # Replace whitespace sequences with single space
-    text = re.sub(r'\s+', ' ', text.strip())
-    # Truncate if too long
-    if len(text) > c.MAX_FILENAME_LENGTH:
-        text = text[:c.MAX_FILENAME_LENGTH].strip()
-    return text or "untitled"
-
-def handle_duplicate_name(name: str, ext: str, used_names: Set[str]) -> str:
+
+def clean_filename(text: str, ext: str = "") -> str:
+    """Convert text to a valid filename that fits with ext and a duplicate counter."""
+    return sanitize_filename(text, ext)
+
+def handle_duplicate_name(name: str, ext: str, used_names: NameRegistry) -> str:
     """Handle duplicate filenames by adding numbers."""
-    base_name = name
-    counter = 1
-    new_name = f"{name}{ext}"
-    
-    while new_name.lower() in (n.lower() for n in used_names):
-        name = f"{base_name} ({counter})"
-        new_name = f"{name}{ext}"
-        counter += 1
-    
-    used_names.add(new_name)
-    return new_name
+    return used_names.allocate(name, ext)
 
-def create_content_based_filename(content: str, ext: str, used_names: Set[str]) -> str:
+def create_content_based_filename(content: str, ext: str, used_names: NameRegistry) -> str:
     """Create filename based on content preview."""
     # Get first line or chunk of content
     text = content.split('\n')[0] if '\n' in content else content
     # Clean and format the text
-    filename = clean_filename(text)
+    filename = clean_filename(text, ext)
     return handle_duplicate_name(filename, ext, used_names)
 
-def create_ai_based_filename_and_summary(content: str, ext: str, used_names: Set[str]) -> Tuple[str, str]:
+def create_ai_based_filename_and_summary(content: str, ext: str, used_names: NameRegistry) -> Tuple[str, str]:
     """Create filename using AI and get summary."""
     try:
         suggested_name, summary = ai.generate_filename_and_summary(content)
-        filename = clean_filename(suggested_name)
+        filename = clean_filename(suggested_name, ext)
         return handle_duplicate_name(filename, ext, used_names), summary
     except Exception as e:
         raise Exception(f"{c.AI_ERROR.format(str(e))}")
@@ -69,15 +41,7 @@ def process_text_for_preview(text: str) -> str:
     """Process text for preview display."""
     if not text:
         return ""
-        
-    # Remove empty lines and extra whitespace
-    text = " ".join(line.strip() for line in text.splitlines() if line.strip())
-    
-    # Limit to MAX_CONTENT_CHARS
-    if len(text) > c.MAX_CONTENT_CHARS:
-        text = text[:c.MAX_CONTENT_CHARS].strip() + "..."
-        
-    return text
+    return make_preview([text])
 
 def get_files_in_directory(
     directory: str,
@@ -101,24 +65,26 @@ def get_files_in_directory(
                  for ext in extensions]
     
     files = []
-    for f in os.listdir(directory):
-        # Check if regular file
-        if not os.path.isfile(os.path.join(directory, f)):
-            continue
-            
-        # Check extension
-        if os.path.splitext(f)[1].lower() not in extensions:
-            continue
-            
-        # Check exclude patterns
-        if exclude_patterns and any(pattern in f for pattern in exclude_patterns):
-            continue
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            f = entry.name
+            # Check extension
+            if os.path.splitext(f)[1].lower() not in extensions:
+                continue
+                
+            # Check exclude patterns
+            if exclude_patterns and any(pattern in f for pattern in exclude_patterns):
+                continue
+                
+            # Check if regular file (usually answered by the directory listing itself)
+            if not entry.is_file():
+                continue
+                
+            files.append(f)
             
-        files.append(f)
-        
-        # Check limit
-        if limit and len(files) >= limit:
-            break
+            # Check limit
+            if limit and len(files) >= limit:
+                break
             
     return files
 
@@ -126,12 +92,12 @@ def create_new_filename(
     filename: str,
     pattern: str,
     content: Optional[str] = None,
-    used_names: Optional[Set[str]] = None,
+    used_names: Optional[NameRegistry] = None,
     ai_summaries: Optional[Dict[str, str]] = None
 ) -> str:
     """Create new filename based on selected pattern."""
     if used_names is None:
-        used_names = set()
+        used_names = NameRegistry()
         
     name, ext = os.path.splitext(filename)
     
@@ -158,49 +124,39 @@ def copy_file_with_new_name(
     old_name: str,
     new_name: str
 ) -> None:
-    """Copy a file with a new name to destination directory."""
+    """Copy a file with a new name to destination directory.
+
+    Raises FileExistsError rather than overwriting an existing file.
+    """
     old_path = os.path.join(source_dir, old_name)
     new_path = os.path.join(dest_dir, new_name)
-    shutil.copy2(old_path, new_path)
+    copy_file(old_path, new_path)
 
 def process_files(
     current_dir: str,
     files_to_rename: List[Tuple[str, str]],
-    new_dir_name: str
+    new_dir_name: str,
+    mode: str = c.OUTPUT_MODE
 ) -> str:
-    """Process files and return the path to renamed files."""
+    """Process files and return the path to renamed files.
+
+    mode (c.OUTPUT_COPY, OUTPUT_REFLINK or OUTPUT_HARDLINK) says how each
+    file is written. Files are handled several at a time; the first error
+    is raised once the rest of the batch is done.
+    """
     new_dir = create_renamed_directory(current_dir, new_dir_name)
-    for old_name, new_name in files_to_rename:
-        if old_name != new_name:
-            copy_file_with_new_name(current_dir, new_dir, old_name, new_name)
+    # One listing of the destination serves the whole batch
+    taken = scan_directory(new_dir)
+    items = [
+        (os.path.join(current_dir, old_name), taken.allocate(*os.path.splitext(new_name)))
+        for old_name, new_name in files_to_rename
+        if old_name != new_name
+    ]
+    for result in copy_files(items, new_dir, taken, operation=output_operation(mode)):
+        if result.error is not None:
+            raise result.error
     return new_dir
 
-def get_docx_preview(file_path: str) -> str:
-    """Get preview of DOCX file."""
-    if not DOCX_AVAILABLE:
-        return "Cần cài đặt python-docx để xem file docx"
-    try:
-        doc = docx.Document(file_path)
-        text = " ".join(paragraph.text for paragraph in doc.paragraphs if paragraph.text)
-        return process_text_for_preview(text)
-    except Exception:
-        return "Không thể đọc file DOCX"
-
-def get_doc_preview(file_path: str) -> str:
-    """Get preview of DOC file."""
-    if not DOC_AVAILABLE:
-        return "Cần cài đặt pywin32 để xem file doc"
-    try:
-        word = win32com.client.Dispatch("Word.Application")
-        doc = word.Documents.Open(file_path)
-        text = doc.Content.Text
-        doc.Close()
-        word.Quit()
-        return process_text_for_preview(text)
-    except Exception:
-        return "Không thể đọc file DOC"
-
-
 def get_file_preview(file_path: str) -> str:
     """Get a preview of the file's content."""
     ext = os.path.splitext(file_path)[1].lower()
@@ -208,12 +164,7 @@ def get_file_preview(file_path: str) -> str:
     if ext not in c.SUPPORTED_EXTENSIONS:
         return c.UNSUPPORTED_FILE
         
-    preview_functions = {
-        '.docx': get_docx_preview,
-        '.doc': get_doc_preview,
-    }
-    
-    preview_func = preview_functions.get(ext)
-    if preview_func:
-        return preview_func(file_path)
-    return c.UNSUPPORTED_FILE
\ No newline at end of file
+    try:
+        return build_snapshot(file_path).preview
+    except Exception:
+        return f"Không thể đọc file {ext[1:].upper()}"
\ No newline at end of file
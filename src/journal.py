@@ -0,0 +1,274 @@
+"""Write-ahead journal of the last rename batch, used to finish it after a crash or undo it."""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from . import constants as c
+from .cache import default_cache_path
+from .planner import Move, RenamePlan, apply_plan
+
+BATCH = "batch"
+UNDO = "undo"
+
+
+def default_journal_path() -> str:
+    """The journal sits next to the extraction cache."""
+    return os.path.join(os.path.dirname(default_cache_path()), c.JOURNAL_FILE_NAME)
+
+
+def _fsync_directory(directory: str) -> None:
+    """Make the renames inside directory durable.
+
+    Windows cannot open a directory for this (and its renames are
+    already written through), so there it does nothing.
+    """
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _same_file(a: str, b: str) -> bool:
+    """Whether two names are links to one file (without following symlinks)."""
+    try:
+        return os.path.samestat(os.lstat(a), os.lstat(b))
+    except OSError:
+        return False
+
+
+class JournalResult(NamedTuple):
+    """What an undo or a recovery did: moves made, and moves that failed."""
+    kind: str  # BATCH or UNDO, the plan that was run or finished
+    directory: str
+    moved: List[Move]
+    failed: List[Tuple[Move, BaseException]]
+
+
+class _Plan:
+    """One plan as read back from the journal."""
+
+    def __init__(self, kind: str, directory: str):
+        self.kind = kind
+        self.directory = directory
+        self.moves: List[Move] = []
+        self.stage_of: List[int] = []
+        self.done: Set[int] = set()
+        self.failed: Set[int] = set()
+        self.committed = False
+
+    def stages(self, seqs) -> RenamePlan:
+        """A RenamePlan of the given moves, keeping their stages."""
+        plan = RenamePlan(self.directory)
+        if seqs:
+            plan.stages = [[] for _ in range(max(self.stage_of) + 1)]
+            for seq in seqs:
+                plan.stages[self.stage_of[seq]].append(self.moves[seq])
+            plan.stages = [stage for stage in plan.stages if stage]
+        return plan
+
+
+class RenameJournal:
+    """Runs rename plans with a record of them written ahead on disk.
+
+    The file holds JSON lines: a "begin" record (kind, directory), one
+    "move" record per move with its stage, "retarget" with the new name
+    before a move is retried under another one, "done" or "failed" for
+    each move as it finishes, and "commit" at the end. A batch replaces the
+    file; its undo is appended as a second plan.
+
+    fsync is grouped: once for all intents before the first rename,
+    after each stage (PLAN_MAX_STAGES at most) and every
+    JOURNAL_GROUP_COMMIT completions, and once for the directory before
+    "commit". Because every stage before the unfinished one is known
+    exactly, recovery only has to look at the disk for the moves of one
+    stage, which never depend on each other. Use from one thread.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_journal_path()
+        self._file = None
+        self._seq: Dict[Move, int] = {}
+        self._unsynced = 0
+
+    def _write(self, op: str, **fields) -> None:
+        self._file.write(json.dumps({"op": op, **fields}, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+
+    def _sync(self, *_) -> None:
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def _open(self, mode: str) -> None:
+        self.close()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, mode, encoding="utf-8")
+        if mode == "a" and self._file.tell():
+            # Start on a fresh line after a record torn by a crash
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _begin(self, plan: RenamePlan, kind: str) -> None:
+        """Record every move of plan, durably, before any of them runs."""
+        self._write(
+            "begin", kind=kind, directory=os.path.abspath(plan.directory),
+            time=datetime.now().isoformat(timespec="seconds")
+        )
+        self._seq = {}
+        for stage, moves in enumerate(plan.stages):
+            for move in moves:
+                self._seq[move] = len(self._seq)
+                self._write("move", seq=self._seq[move], stage=stage, src=move.src, dst=move.dst)
+        self._sync()
+        _fsync_directory(os.path.dirname(self.path))
+
+    def _record(self, move: Move, error: Optional[BaseException]) -> None:
+        self._write("failed" if error else "done", seq=self._seq[move])
+        if self._unsynced >= c.JOURNAL_GROUP_COMMIT:
+            self._sync()
+
+    def _retarget(self, move: Move, retry: Move) -> None:
+        """Record, durably, the name a move is retried under before it runs."""
+        seq = self._seq[retry] = self._seq[move]
+        self._write("retarget", seq=seq, dst=retry.dst)
+        self._sync()
+
+    def _apply(self, plan: RenamePlan, workers: int) -> List[Tuple[Move, BaseException]]:
+        """Run plan and commit it; if anything escapes, recover() finishes it later."""
+        try:
+            failures = apply_plan(
+                plan, workers=workers, on_move=self._record, on_stage=self._sync,
+                on_retarget=self._retarget
+            )
+        except BaseException:
+            self.close()
+            raise
+        _fsync_directory(plan.directory)
+        self._write("commit")
+        self._sync()
+        self.close()
+        return failures
+
+    def run(self, plan: RenamePlan, workers: int = c.PLAN_WORKERS) -> List[Tuple[Move, BaseException]]:
+        """apply_plan, journaled; the plan becomes the one undo turns back."""
+        if not len(plan):
+            return []
+        self._open("w")
+        self._begin(plan, BATCH)
+        return self._apply(plan, workers)
+
+    def _load(self) -> List[_Plan]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        plans: List[_Plan] = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn by a crash; nothing after it was written then
+            op = record.get("op")
+            if op == "begin":
+                plans.append(_Plan(record["kind"], record["directory"]))
+            elif not plans:
+                continue
+            elif op == "move":
+                plans[-1].moves.append(Move(record["src"], record["dst"]))
+                plans[-1].stage_of.append(record["stage"])
+            elif op == "retarget":
+                seq = record["seq"]
+                plans[-1].moves[seq] = plans[-1].moves[seq]._replace(dst=record["dst"])
+            elif op == "done":
+                plans[-1].done.add(record["seq"])
+            elif op == "failed":
+                plans[-1].failed.add(record["seq"])
+            elif op == "commit":
+                plans[-1].committed = True
+        return plans
+
+    def can_undo(self) -> bool:
+        """Whether the last plan is a finished batch."""
+        plans = self._load()
+        return bool(plans) and plans[-1].kind == BATCH and plans[-1].committed
+
+    def recover(self, workers: int = c.PLAN_WORKERS) -> Optional[JournalResult]:
+        """Finish a batch (or an undo) that a crash cut short.
+
+        Meant to run at start-up; None when there is nothing to finish.
+        Moves of the stage that was running are taken as done when their
+        new name exists and their old one does not. Where both names are
+        the same file, the rename was cut between its link and its unlink
+        (rename_no_clobber without renameat2), so the old name is removed.
+        """
+        plans = self._load()
+        if not plans or plans[-1].committed:
+            return None
+        last = plans[-1]
+        settled = last.done | last.failed
+        pending = [seq for seq in range(len(last.moves)) if seq not in settled]
+        running = min((last.stage_of[seq] for seq in pending), default=None)
+        remaining = []
+        self._open("a")
+        self._seq = {move: seq for seq, move in enumerate(last.moves)}
+        for seq in pending:
+            move = last.moves[seq]
+            if last.stage_of[seq] == running:
+                src = os.path.join(last.directory, move.src)
+                dst = os.path.join(last.directory, move.dst)
+                if _same_file(src, dst):
+                    os.unlink(src)
+                if os.path.lexists(dst) and not os.path.lexists(src):
+                    self._write("done", seq=seq)
+                    continue
+            remaining.append(seq)
+
+        plan = last.stages(remaining)
+        failures = self._apply(plan, workers)
+        failed_moves = {move for move, _ in failures}
+        moved = [move for move in plan.moves() if move not in failed_moves]
+        return JournalResult(last.kind, last.directory, moved, failures)
+
+    def undo(self, workers: int = c.PLAN_WORKERS) -> Optional[JournalResult]:
+        """Move the files of the last batch back; None if there is nothing to undo.
+
+        The undo is a plan of its own, the batch's completed moves
+        reversed and in reverse stage order, journaled like the batch.
+        """
+        plans = self._load()
+        if not plans or plans[-1].kind != BATCH or not plans[-1].committed:
+            return None
+        batch = plans[-1]
+        last_stage = max(batch.stage_of, default=0)
+        inverse = RenamePlan(batch.directory)
+        inverse.stages = [[] for _ in range(last_stage + 1)]
+        for seq in sorted(batch.done):
+            move = batch.moves[seq]
+            inverse.stages[last_stage - batch.stage_of[seq]].append(Move(move.dst, move.src))
+        inverse.stages = [stage for stage in inverse.stages if stage]
+
+        self._open("a")
+        self._begin(inverse, UNDO)
+        failures = self._apply(inverse, workers)
+        failed_moves = {move for move, _ in failures}
+        moved = [move for move in inverse.moves() if move not in failed_moves]
+        return JournalResult(UNDO, batch.directory, moved, failures)
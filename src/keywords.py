@@ -0,0 +1,114 @@
+"""Match many keywords against a paragraph in one pass (Aho–Corasick)."""
+
+import unicodedata
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+from . import constants as c
+
+
+def normalize(text: str, strip_diacritics: bool = c.KEYWORD_STRIP_DIACRITICS) -> str:
+    """Case-fold text and, optionally, drop Vietnamese diacritics (về việc -> ve viec)."""
+    text = unicodedata.normalize("NFC", text).casefold()
+    if not strip_diacritics:
+        return text
+    decomposed = unicodedata.normalize("NFD", text.replace("đ", "d"))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class KeywordMatcher:
+    """Aho–Corasick automaton over normalized keywords.
+
+    Matching is by substring, like `keyword in text`, but every keyword
+    is found in a single scan of the paragraph whatever the list size.
+    A keyword listed several times weighs as many times; empty entries
+    are ignored.
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        strip_diacritics: bool = c.KEYWORD_STRIP_DIACRITICS
+    ):
+        self.strip_diacritics = strip_diacritics
+        weights = Counter(
+            key for key in (normalize(k.strip(), strip_diacritics) for k in keywords) if key
+        )
+        self.keywords: List[str] = list(weights)
+        self.weights: List[int] = [weights[key] for key in self.keywords]
+
+        # State 0 is the root; outputs are keyword ids ending at each state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (index,)
+        self._link()
+
+    def _link(self) -> None:
+        """Compute failure links breadth-first and merge inherited outputs."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] += self._output[self._fail[child]]
+        # Transitions resolved through failure links are memoized here
+        self._delta: List[Dict[str, int]] = [dict(edges) for edges in self._goto]
+
+    def _resolve(self, state: int, ch: str) -> int:
+        """Follow failure links for a transition not seen from this state yet."""
+        current = state
+        while current and ch not in self._goto[current]:
+            current = self._fail[current]
+        target = self._goto[current].get(ch, 0)
+        self._delta[state][ch] = target
+        return target
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords)
+
+    def find(self, text: str) -> Set[int]:
+        """Ids of the distinct keywords that occur in text."""
+        found: Set[int] = set()
+        if not self.keywords:
+            return found
+        delta, output = self._delta, self._output
+        state = 0
+        for ch in normalize(text, self.strip_diacritics):
+            next_state = delta[state].get(ch)
+            if next_state is None:
+                next_state = self._resolve(state, ch)
+            state = next_state
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def count(self, text: str) -> int:
+        """Number of keyword entries (with repeats) that occur in text."""
+        return sum(self.weights[index] for index in self.find(text))
+
+
+@lru_cache(maxsize=8)
+def compile_keywords(
+    keywords: Tuple[str, ...],
+    strip_diacritics: bool = c.KEYWORD_STRIP_DIACRITICS
+) -> KeywordMatcher:
+    """Build (or reuse) the matcher for a keyword list."""
+    return KeywordMatcher(keywords, strip_diacritics)
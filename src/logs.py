@@ -0,0 +1,197 @@
+"""Application logging: records are queued and written in batches by a background thread."""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler
+from typing import List, Optional
+
+from . import constants as c
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_STOP = object()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue records as they are, so messages are formatted on the writer thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def record_fields(record: logging.LogRecord) -> dict:
+    """The `extra` fields attached to a record (event, path, new_name, ...)."""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS}
+
+
+class TextFormatter(logging.Formatter):
+    """rename_log.txt lines: [time] EVENT: message.
+
+    The event (RENAME, ...) stands in for the level name when one is given.
+    """
+
+    def __init__(self):
+        super().__init__(datefmt=c.LOG_FILE_TIME_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        label = getattr(record, "event", None) or record.levelname
+        line = f"[{self.formatTime(record, self.datefmt)}] {label}: {record.getMessage()}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the `extra` fields as keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BatchFileHandler(logging.FileHandler):
+    """File handler that leaves flushing to whoever feeds it batches."""
+
+    def __init__(self, filename: str):
+        super().__init__(filename, encoding="utf-8", delay=True)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class BatchListener:
+    """Drain a log queue on a daemon thread.
+
+    Whatever has queued up (at most batch_size records) is handed to the
+    handlers in one go, and each handler is flushed once per batch.
+    """
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue",
+        handlers: List[logging.Handler],
+        batch_size: int = c.LOG_BATCH_SIZE
+    ):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is _STOP:
+                    stop = True
+                    continue
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            for handler in self.handlers:
+                handler.flush()
+            if stop:
+                return
+
+    def stop(self) -> None:
+        """Write everything still queued, then end the thread."""
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+
+_listener: Optional[BatchListener] = None
+_lock = threading.Lock()
+
+
+def setup_logging(
+    log_file: Optional[str] = c.LOG_FILE,
+    json_file: Optional[str] = c.LOG_JSON_FILE,
+    level: Optional[str] = None,
+    console_level: str = c.LOG_CONSOLE_LEVEL
+) -> None:
+    """Route the app's loggers through the background writer.
+
+    level defaults to the RENAME_APP_LOG_LEVEL environment variable, then
+    c.LOG_LEVEL; DEBUG adds the scored paragraphs of every file. A level
+    logging does not know falls back to INFO with a warning. Calling
+    again replaces the previous setup.
+    """
+    global _listener
+    level = level or os.environ.get("RENAME_APP_LOG_LEVEL") or c.LOG_LEVEL
+    if isinstance(level, str):
+        level = level.strip().upper()
+    unknown = isinstance(level, str) and not isinstance(logging.getLevelName(level), int)
+    handlers: List[logging.Handler] = []
+    if log_file:
+        text_handler = BatchFileHandler(log_file)
+        text_handler.setFormatter(TextFormatter())
+        handlers.append(text_handler)
+    if json_file:
+        json_handler = BatchFileHandler(json_file)
+        json_handler.setFormatter(JsonFormatter())
+        handlers.append(json_handler)
+    if console_level:
+        console = logging.StreamHandler(sys.stderr)
+        console.setLevel(console_level)
+        console.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+        handlers.append(console)
+
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        log_queue: "queue.Queue" = queue.Queue()
+        _listener = BatchListener(log_queue, handlers)
+        _listener.start()
+
+        logger = logging.getLogger(__package__)
+        for old in list(logger.handlers):
+            logger.removeHandler(old)
+        logger.addHandler(DeferredQueueHandler(log_queue))
+        logger.setLevel(logging.INFO if unknown else level)
+        logger.propagate = False
+    if unknown:
+        logger.warning("Unknown log level %r, using INFO", level)
+
+
+@atexit.register
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -1,5 +1,6 @@
 """Main entry point for the File Renamer application."""
 
+import multiprocessing
 import os
 import sys
 import tkinter as tk
@@ -9,13 +10,17 @@ from pathlib import Path
 src_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(src_dir))
 
+from src.logs import setup_logging
 from src.ui import FileRenamerUI
 
 def main():
     """Initialize and run the application."""
+    setup_logging()
     root = tk.Tk()
     app = FileRenamerUI(root)
     root.mainloop()
 
 if __name__ == "__main__":
+    # Extraction workers are spawned processes; needed for frozen builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""Pick the document number, issue date, year and type out of a document's first paragraphs."""
+
+import re
+import unicodedata
+from datetime import date
+from typing import Iterable, NamedTuple, Optional
+
+from . import constants as c
+
+_TYPES = "|".join(
+    re.escape(name) for name in sorted(c.DOCUMENT_TYPES, key=len, reverse=True)
+)
+
+# One alternation, scanned once per paragraph. Where two alternatives could
+# start at the same place the earlier one wins, so a year inside a date or a
+# number is consumed by it and never reported on its own.
+_PATTERN = re.compile(
+    # The issue date: "ngày 05.04.2021", "ngày 01 tháng 6 năm 2020"
+    r"(?i:\bngày)\s*(?P<day>\d{1,2})\s*[./-]\s*(?P<month>\d{1,2})\s*[./-]\s*(?P<year>\d{4})\b"
+    r"|(?i:\bngày)\s*(?P<day_w>\d{1,2})\s*(?i:tháng)\s*(?P<month_w>\d{1,2})"
+    r"\s*,?\s*(?i:năm)\s*(?P<year_w>\d{4})\b"
+    # Any other date: "Ngày cấp: 17/10/2008", "04/04/2014" in a table cell
+    r"|\b(?P<other_day>\d{1,2})\s*[./-]\s*(?P<other_month>\d{1,2})\s*[./-]\s*(?P<other_year>\d{4})\b"
+    # A document number: "Cv số: 09/SKKB", "số 09.SKKB", "Số: 01 QCLĐ/KB/2020"
+    r"|(?i:\bsố)\s*:?\s*(?P<number>\d[\w.-]*(?:/[\w.-]+)+"
+    r"|\d+[.-]?[A-ZĐ][A-ZĐ0-9.-]*\b"
+    r"|\d+\s+[A-ZĐ]{2,}[A-ZĐ0-9]*[./-][A-ZĐ0-9./-]*\b)"
+    # Bare digits ("Số: 12", "Số 456 Đường ...") are a number only in a header line
+    r"|(?i:\bsố)\s*:?\s*(?P<bare_number>\d+)\b"
+    # A bare "173/2014/TT-BTC"
+    r"|\b(?P<code>\d{1,4}/(?:19|20)\d{2}/[A-ZĐ][\w-]*)"
+    rf"|\b(?P<type>{_TYPES})\b"
+    r"|\b(?P<plain_year>(?:19|20)\d{2})\b"
+)
+_YEAR = re.compile(r"(?<!\d)(?:19|20)\d{2}(?!\d)")
+# A date right after one of these labels belongs to a person or an ID card
+_PERSONAL_LABEL = re.compile(r"(?i:(?:cấp|sinh)(?:\s+ngày)?)\s*:?\s*$")
+
+
+class Found(NamedTuple):
+    """A value and where it starts: paragraph index and offset in its NFC text."""
+    value: str
+    paragraph: int
+    offset: int
+
+
+class DocumentMetadata(NamedTuple):
+    number: Optional[Found] = None
+    date: Optional[Found] = None  # Issue date, dd/mm/yyyy
+    year: Optional[Found] = None
+    doc_type: Optional[Found] = None
+
+
+def _valid_date(day: str, month: str, year: str) -> Optional[str]:
+    try:
+        return date(int(year), int(month), int(day)).strftime("%d/%m/%Y")
+    except ValueError:
+        return None
+
+
+def extract_metadata(texts: Iterable[str]) -> DocumentMetadata:
+    """Scan paragraphs in order, keeping the first of each field.
+
+    Only a date introduced by "ngày" is the issue date. A "số" followed by
+    plain digits is a number only when it opens one of the first
+    METADATA_HEADER_PARAGRAPHS paragraphs. The year is taken from the issue
+    date, else from the document number, else it is the first year on its
+    own, else the year of the first other date that is not an ID card's or
+    a birth date ("Ngày cấp: 17/10/2008").
+    """
+    number = issued = issued_year = doc_type = plain_year = other_year = None
+    for index, text in enumerate(texts):
+        text = unicodedata.normalize("NFC", text)
+        for match in _PATTERN.finditer(text):
+            kind = match.lastgroup
+            if kind in ("year", "year_w"):
+                if issued is None:
+                    value = _valid_date(*(
+                        match.group("day", "month", "year") if kind == "year"
+                        else match.group("day_w", "month_w", "year_w")
+                    ))
+                    if value:
+                        issued = Found(value, index, match.start())
+                        issued_year = Found(match.group(kind), index, match.start(kind))
+            elif kind == "other_year":
+                if other_year is None and not _PERSONAL_LABEL.search(text[:match.start()]):
+                    if _valid_date(*match.group("other_day", "other_month", "other_year")):
+                        other_year = Found(match.group(kind), index, match.start(kind))
+            elif kind == "bare_number":
+                in_header = index < c.METADATA_HEADER_PARAGRAPHS and not text[:match.start()].strip()
+                if in_header and number is None:
+                    number = Found(match.group(kind), index, match.start(kind))
+            elif kind in ("number", "code"):
+                if number is None:
+                    number = Found(match.group(kind).rstrip("./-"), index, match.start(kind))
+            elif kind == "type":
+                if doc_type is None:
+                    doc_type = Found(match.group(kind), index, match.start())
+            elif plain_year is None:
+                plain_year = Found(match.group(kind), index, match.start())
+        if issued and number and doc_type:
+            break
+
+    in_number = _YEAR.search(number.value) if number else None
+    if issued:
+        year = issued_year
+    elif in_number:
+        year = Found(in_number.group(), number.paragraph, number.offset + in_number.start())
+    else:
+        year = plain_year or other_year
+    return DocumentMetadata(number, issued, year, doc_type)
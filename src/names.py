@@ -0,0 +1,78 @@
+"""Keep track of file names already taken, ignoring case and Unicode normalization."""
+
+import os
+import unicodedata
+from typing import Dict, Iterable, Iterator
+
+
+def name_key(filename: str) -> str:
+    """Compare names the way case-insensitive file systems do."""
+    return unicodedata.normalize("NFC", filename).casefold()
+
+
+class NameRegistry:
+    """Set of taken file names with O(1) allocation of unique ones.
+
+    For each base name the next " (n)" counter to try is remembered, so a
+    thousand files all titled "CÔNG VĂN" do not each re-probe every
+    suffix handed out before. A released name can be taken again by
+    asking for it exactly; counters never go back.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: Dict[str, str] = {}
+        self._next: Dict[str, int] = {}
+        for filename in names:
+            self.add(filename)
+
+    def __contains__(self, filename: str) -> bool:
+        return name_key(filename) in self._names
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names.values())
+
+    def add(self, filename: str) -> bool:
+        """Take a name; False if it (or a case variant) is already taken."""
+        key = name_key(filename)
+        if key in self._names:
+            return False
+        self._names[key] = filename
+        return True
+
+    def allocate(self, name: str, ext: str = "") -> str:
+        """Take name + ext, or the first free "name (n)" + ext after it."""
+        candidate = f"{name}{ext}"
+        if self.add(candidate):
+            return candidate
+        base = name_key(candidate)
+        counter = self._next.get(base, 1)
+        while True:
+            candidate = f"{name} ({counter}){ext}"
+            counter += 1
+            if self.add(candidate):
+                break
+        self._next[base] = counter
+        return candidate
+
+    def release(self, filename: str) -> None:
+        """Give a name back, e.g. when the row that held it is renamed again."""
+        self._names.pop(name_key(filename), None)
+
+    def clear(self) -> None:
+        self._names.clear()
+        self._next.clear()
+
+
+def scan_directory(directory: str) -> NameRegistry:
+    """Registry of every entry in a directory, read with one scandir pass.
+
+    A missing directory gives an empty registry.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return NameRegistry(entry.name for entry in entries)
+    except FileNotFoundError:
+        return NameRegistry()
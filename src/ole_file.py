@@ -0,0 +1,201 @@
+"""Read streams out of OLE compound files (legacy Office formats)."""
+
+import mmap
+import struct
+from typing import Callable, Dict, List, Optional
+
+OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+HEADER_SIZE = 512
+DIR_ENTRY_SIZE = 128
+MINI_SECTOR_SIZE = 64
+
+# Special sector ids
+MAX_REG_SECTOR = 0xFFFFFFFA
+NO_STREAM = 0xFFFFFFFF
+
+# Directory entry types
+STORAGE = 1
+STREAM = 2
+ROOT = 5
+
+
+class DirEntry:
+    """One entry of the compound file directory."""
+
+    def __init__(self, sid: int, raw: bytes):
+        name_len = struct.unpack_from("<H", raw, 64)[0]
+        self.sid = sid
+        self.name = raw[:max(0, name_len - 2)].decode("utf-16-le", "replace")
+        self.type = raw[66]
+        self.left, self.right, self.child = struct.unpack_from("<III", raw, 68)
+        self.start = struct.unpack_from("<I", raw, 116)[0]
+        # Only the low 32 bits are meaningful in version 3 files
+        self.size = struct.unpack_from("<I", raw, 120)[0]
+
+
+class OleStream:
+    """Random access to one stream without reading it whole."""
+
+    def __init__(
+        self,
+        buffer,
+        base: Callable[[int], int],
+        sectors: List[int],
+        sector_size: int,
+        size: int
+    ):
+        self._buffer = buffer
+        self._base = base
+        self._sectors = sectors
+        self._sector_size = sector_size
+        self.size = min(size, len(sectors) * sector_size)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def read(self, offset: int, length: int) -> bytes:
+        """Read length bytes at offset, clipped to the end of the stream."""
+        end = min(offset + length, self.size)
+        if offset < 0 or offset >= end:
+            return b""
+        parts = []
+        size = self._sector_size
+        while offset < end:
+            index, skip = divmod(offset, size)
+            take = min(size - skip, end - offset)
+            start = self._base(self._sectors[index]) + skip
+            parts.append(self._buffer[start:start + take])
+            offset += take
+        return b"".join(parts)
+
+
+class OleFile:
+    """Read-only, memory-mapped view of an OLE compound file."""
+
+    def __init__(self, filepath: str):
+        self._file = open(filepath, "rb")
+        try:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Empty file: {filepath}")
+        try:
+            self._load(filepath)
+        except Exception:
+            self.close()
+            raise
+
+    def _load(self, filepath: str) -> None:
+        header = self._buffer[:HEADER_SIZE]
+        if len(header) < HEADER_SIZE or header[:8] != OLE_SIGNATURE:
+            raise ValueError(f"Not an OLE compound file: {filepath}")
+
+        self.sector_size = 1 << struct.unpack_from("<H", header, 0x1E)[0]
+        (num_fat, first_dir, _, self.mini_cutoff, first_minifat, num_minifat,
+         first_difat, num_difat) = struct.unpack_from("<IIIIIIII", header, 0x2C)
+
+        # FAT sector ids: 109 in the header, the rest in the DIFAT chain
+        fat_sectors = list(struct.unpack_from("<109I", header, 0x4C))
+        per_difat = self.sector_size // 4 - 1
+        sector = first_difat
+        for _ in range(num_difat):
+            if sector > MAX_REG_SECTOR:
+                break
+            ids = self._unpack_sector(sector)
+            fat_sectors.extend(ids[:per_difat])
+            sector = ids[per_difat]
+        self._fat = []
+        for sector in fat_sectors[:num_fat]:
+            if sector <= MAX_REG_SECTOR:
+                self._fat.extend(self._unpack_sector(sector))
+
+        dir_data = b"".join(
+            self._sector_data(s) for s in self._chain(first_dir, self._fat)
+        )
+        self._entries = [
+            DirEntry(sid, dir_data[off:off + DIR_ENTRY_SIZE])
+            for sid, off in enumerate(range(0, len(dir_data) - DIR_ENTRY_SIZE + 1, DIR_ENTRY_SIZE))
+        ]
+        if not self._entries or self._entries[0].type != ROOT:
+            raise ValueError(f"Missing root storage: {filepath}")
+
+        root = self._entries[0]
+        self._minifat: List[int] = []
+        self._mini_data: Optional[bytes] = None
+        if num_minifat and first_minifat <= MAX_REG_SECTOR:
+            for sector in self._chain(first_minifat, self._fat):
+                self._minifat.extend(self._unpack_sector(sector))
+            # Small streams all live in the root's mini stream
+            mini_stream = self._regular_stream(root.start, root.size)
+            self._mini_data = mini_stream.read(0, mini_stream.size)
+
+        self._root_streams = self._list_children(root)
+
+    def _sector_offset(self, sector: int) -> int:
+        return (sector + 1) * self.sector_size
+
+    def _sector_data(self, sector: int) -> bytes:
+        offset = self._sector_offset(sector)
+        return self._buffer[offset:offset + self.sector_size]
+
+    def _unpack_sector(self, sector: int) -> List[int]:
+        data = self._sector_data(sector)
+        return list(struct.unpack(f"<{len(data) // 4}I", data))
+
+    @staticmethod
+    def _chain(start: int, table: List[int]) -> List[int]:
+        """Follow an allocation chain, guarding against loops."""
+        chain = []
+        sector = start
+        while sector <= MAX_REG_SECTOR and sector < len(table) and len(chain) <= len(table):
+            chain.append(sector)
+            sector = table[sector]
+        return chain
+
+    def _regular_stream(self, start: int, size: int) -> OleStream:
+        return OleStream(
+            self._buffer, self._sector_offset, self._chain(start, self._fat),
+            self.sector_size, size,
+        )
+
+    def _list_children(self, storage: DirEntry) -> Dict[str, DirEntry]:
+        """Map the direct children of a storage by name."""
+        children: Dict[str, DirEntry] = {}
+        pending = [storage.child]
+        while pending:
+            sid = pending.pop()
+            if sid == NO_STREAM or sid >= len(self._entries) or len(children) > len(self._entries):
+                continue
+            entry = self._entries[sid]
+            if entry.name in children:
+                continue
+            children[entry.name] = entry
+            pending.extend((entry.left, entry.right))
+        return children
+
+    def exists(self, name: str) -> bool:
+        """Check for a stream at the root of the file."""
+        entry = self._root_streams.get(name)
+        return entry is not None and entry.type == STREAM
+
+    def open_stream(self, name: str) -> OleStream:
+        """Open a stream at the root of the file."""
+        entry = self._root_streams.get(name)
+        if entry is None or entry.type != STREAM:
+            raise KeyError(f"No stream named {name!r}")
+        if entry.size >= self.mini_cutoff or self._mini_data is None:
+            return self._regular_stream(entry.start, entry.size)
+        return OleStream(
+            self._mini_data, lambda sector: sector * MINI_SECTOR_SIZE,
+            self._chain(entry.start, self._minifat), MINI_SECTOR_SIZE, entry.size,
+        )
+
+    def close(self) -> None:
+        self._buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> "OleFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,82 @@
+"""Read text blocks from the first pages of a PDF."""
+
+from typing import Iterator, List, Tuple
+
+from . import constants as c
+from .docx_reader import Block
+
+try:
+    import pymupdf as fitz
+    PDF_AVAILABLE = True
+except ImportError:
+    try:
+        import fitz  # PyMuPDF before 1.24.3
+        PDF_AVAILABLE = True
+    except ImportError:
+        PDF_AVAILABLE = False
+
+# get_text("dict") defaults minus TEXT_PRESERVE_IMAGES, so the images of
+# scanned pages are skipped instead of decoded into the result
+_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES if PDF_AVAILABLE else 0
+
+
+def _text_area(blocks: List[dict]) -> Tuple[float, float]:
+    """Horizontal extent of all text on a page, i.e. the page minus its margins."""
+    return (
+        min(block["bbox"][0] for block in blocks),
+        max(block["bbox"][2] for block in blocks),
+    )
+
+
+def _is_line_centered(bbox, left: float, right: float, tolerance: float) -> bool:
+    """Check a line has equal, non-zero space on both sides between left and right."""
+    before = bbox[0] - left
+    after = right - bbox[2]
+    return before > tolerance and abs(before - after) <= tolerance
+
+
+def _page_blocks(page) -> Iterator[Block]:
+    """Turn the text blocks of one page into Blocks."""
+    text_blocks = [
+        block for block in page.get_text("dict", flags=_TEXT_FLAGS)["blocks"]
+        if block.get("type") == 0 and block.get("lines")
+    ]
+    if not text_blocks:
+        return
+    # Centered on the text column (asymmetric margins) or on the page itself
+    areas = [_text_area(text_blocks), (0.0, page.rect.width)]
+    tolerance = page.rect.width * c.PDF_CENTER_TOLERANCE
+
+    for block in text_blocks:
+        lines = []
+        font_size = 0.0
+        centered = True
+        for line in block["lines"]:
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if not text:
+                continue
+            lines.append(text)
+            for span in line["spans"]:
+                if span["text"].strip():
+                    font_size = max(font_size, round(span["size"], 1))
+            centered = centered and any(
+                _is_line_centered(line["bbox"], left, right, tolerance) for left, right in areas
+            )
+        if lines:
+            # Wrapped lines of one block belong to the same sentence
+            yield Block(" ".join(lines), font_size, centered)
+
+
+def iter_blocks(filepath: str, max_pages: int = c.PDF_MAX_PAGES) -> Iterator[Block]:
+    """Yield the text blocks of the first max_pages pages in content order.
+
+    Later pages are never loaded, so long scans cost the same as short ones.
+    """
+    if not PDF_AVAILABLE:
+        raise ImportError("PyMuPDF is required to read PDF files")
+    doc = fitz.open(filepath)
+    try:
+        for index in range(min(max_pages, doc.page_count)):
+            yield from _page_blocks(doc.load_page(index))
+    finally:
+        doc.close()
@@ -0,0 +1,69 @@
+"""Move files to new names without ever overwriting an existing file."""
+
+import errno
+import os
+import sys
+
+from .copy_engine import NO_LINK_ERRORS
+
+try:
+    import ctypes
+    _renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    _renameat2.argtypes = [
+        ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint
+    ]
+    RENAMEAT2_AVAILABLE = sys.platform.startswith("linux")
+except (ImportError, OSError, AttributeError, TypeError):
+    RENAMEAT2_AVAILABLE = False
+
+_AT_FDCWD = -100
+_RENAME_NOREPLACE = 1
+# errno values meaning "this kernel or file system has no RENAME_NOREPLACE"
+_NO_NOREPLACE = {
+    errno.EINVAL, errno.ENOSYS,
+    getattr(errno, "ENOTSUP", errno.EINVAL), getattr(errno, "EOPNOTSUPP", errno.EINVAL),
+}
+
+
+def _rename_noreplace(src: str, dst: str) -> bool:
+    """One atomic renameat2(RENAME_NOREPLACE); False where it is not supported."""
+    if not RENAMEAT2_AVAILABLE:
+        return False
+    if _renameat2(_AT_FDCWD, os.fsencode(src), _AT_FDCWD, os.fsencode(dst), _RENAME_NOREPLACE) == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in _NO_NOREPLACE:
+        return False
+    raise OSError(error, os.strerror(error), src, None, dst)
+
+
+def rename_no_clobber(src: str, dst: str) -> None:
+    """Rename src to dst, raising FileExistsError instead of replacing dst.
+
+    Windows' rename already refuses to replace a file, and so does Linux's
+    renameat2 with RENAME_NOREPLACE. Elsewhere the file is hard-linked to
+    its new name (which fails atomically if the name is taken) and the
+    old name is then removed. File systems without hard links fall back
+    to a check followed by a rename.
+    """
+    if os.name == "nt":
+        os.rename(src, dst)
+        return
+    if _rename_noreplace(src, dst):
+        return
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno not in NO_LINK_ERRORS:
+            raise
+        if os.path.lexists(dst):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst)
+        os.rename(src, dst)
+        return
+    try:
+        os.unlink(src)
+    except OSError:
+        os.unlink(dst)
+        raise
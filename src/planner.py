@@ -0,0 +1,253 @@
+"""Plan a whole batch of renames in one directory, then carry the plan out."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import constants as c
+from .names import NameRegistry, name_key, scan_directory
+from .placement import rename_no_clobber
+
+
+class Move(NamedTuple):
+    """Rename src to dst, both names inside the plan's directory."""
+    src: str
+    dst: str
+
+
+class RenamePlan:
+    """Renames grouped into stages that must run in order.
+
+    Moves within a stage touch distinct names and none of them needs a
+    name another one is vacating, so they can run in any order or in
+    parallel. targets maps each source to its final name; conflicts
+    lists (source, wanted, given) where the wanted name was taken;
+    missing lists sources that are not in the directory. registry holds
+    the names given out, so apply_plan can pick another one when a
+    final name is taken after planning (None: no retries).
+    """
+
+    def __init__(self, directory: str, registry: Optional[NameRegistry] = None):
+        self.directory = directory
+        self.registry = registry
+        self.stages: List[List[Move]] = []
+        self.targets: Dict[str, str] = {}
+        self.conflicts: List[Tuple[str, str, str]] = []
+        self.missing: List[str] = []
+
+    def __len__(self) -> int:
+        return sum(len(stage) for stage in self.stages)
+
+    def moves(self):
+        for stage in self.stages:
+            yield from stage
+
+
+def _temp_name(registry: NameRegistry, src: str, index: int) -> str:
+    """A free name for a file parked while a cycle is broken."""
+    ext = os.path.splitext(src)[1]
+    token = os.urandom(4).hex()
+    return registry.allocate(f"{c.PLAN_TEMP_PREFIX}{token}-{index}", ext)
+
+
+def plan_renames(
+    directory: str,
+    mapping: Sequence[Tuple[str, str]],
+    registry: Optional[NameRegistry] = None
+) -> RenamePlan:
+    """Turn (old name, wanted name) pairs into a RenamePlan.
+
+    registry is a snapshot of the directory (scan_directory by default);
+    names are compared ignoring case. Each wanted name is allocated
+    against the files that stay put and the names already given out in
+    the batch, so two files never end up with the same name; a name
+    that another source is leaving may be taken. Chains (A -> B while
+    B -> C) are ordered into stages, and cycles (A <-> B, or a change
+    of case only) are broken by parking one file under a temporary name.
+    """
+    if registry is None:
+        registry = scan_directory(directory)
+    plan = RenamePlan(directory, registry)
+
+    wanted: List[Tuple[str, str]] = []
+    seen = set()
+    for old, new in mapping:
+        key = name_key(old)
+        if key in seen:
+            raise ValueError(f"{old} appears twice in the batch")
+        seen.add(key)
+        if old == new:
+            continue
+        if old not in registry:
+            plan.missing.append(old)
+            continue
+        wanted.append((old, new))
+
+    # Sources free their names, which the batch may then hand out again
+    for old, _ in wanted:
+        registry.release(old)
+    moves: List[Move] = []
+    for old, new in wanted:
+        given = registry.allocate(*os.path.splitext(new))
+        if given != new:
+            plan.conflicts.append((old, new, given))
+        plan.targets[old] = given
+        moves.append(Move(old, given))
+
+    # blocker[i]: the move whose source currently holds the name move i wants
+    by_src = {name_key(move.src): i for i, move in enumerate(moves)}
+    blocker: List[Optional[int]] = [by_src.get(name_key(move.dst)) for move in moves]
+
+    plan.stages = _stages(*_break_cycles(moves, blocker, registry))
+    if len(plan.stages) > c.PLAN_MAX_STAGES:
+        # Long chains would run one rename at a time; two stages instead
+        plan.stages = _stages(*_park_all(moves, blocker, registry))
+    return plan
+
+
+def _park(
+    moves: List[Move],
+    blocker: List[Optional[int]],
+    operations: List[Move],
+    after: List[Optional[int]],
+    registry: NameRegistry,
+    i: int
+) -> None:
+    """Split move i into src -> temporary name and temporary -> dst.
+
+    The parking move keeps index i, so the move that wanted moves[i].src
+    (and waits for index i) now waits for just the parking. For a change
+    of case the final move is that waiting move.
+    """
+    temp = _temp_name(registry, moves[i].src, i)
+    operations[i] = Move(moves[i].src, temp)
+    after[i] = None
+    operations.append(Move(temp, moves[i].dst))
+    # A blocker is itself parked (in a cycle, or when parking all), so it
+    # runs no earlier than the parking of moves[i]
+    after.append(i if blocker[i] is None else blocker[i])
+
+
+def _break_cycles(moves, blocker, registry):
+    """Operations and what each waits for, parking one file per cycle."""
+    operations: List[Move] = list(moves)
+    after: List[Optional[int]] = list(blocker)
+    state = [0] * len(moves)  # 0 unseen, 1 on the current path, 2 done
+    for start in range(len(moves)):
+        path = []
+        i: Optional[int] = start
+        while i is not None and state[i] == 0:
+            state[i] = 1
+            path.append(i)
+            i = blocker[i]
+        if i is not None and state[i] == 1:
+            # moves[i] closes a cycle: i -> blocker[i] -> ... -> i
+            _park(moves, blocker, operations, after, registry, i)
+        for j in path:
+            state[j] = 2
+    return operations, after
+
+
+def _park_all(moves, blocker, registry):
+    """Operations and what each waits for, parking every file whose name is wanted."""
+    operations: List[Move] = list(moves)
+    after: List[Optional[int]] = list(blocker)
+    for i in sorted({b for b in blocker if b is not None}):
+        _park(moves, blocker, operations, after, registry, i)
+    return operations, after
+
+
+def _stages(operations: List[Move], after: List[Optional[int]]) -> List[List[Move]]:
+    """Group operations by the length of the chain that must run before each."""
+    stage_of: List[Optional[int]] = [None] * len(operations)
+    for start in range(len(operations)):
+        chain = []
+        i = start
+        while i is not None and stage_of[i] is None:
+            chain.append(i)
+            i = after[i]
+        depth = -1 if i is None else stage_of[i]
+        for j in reversed(chain):
+            depth += 1
+            stage_of[j] = depth
+    stages: List[List[Move]] = [[] for _ in range(max(stage_of, default=-1) + 1)]
+    for operation, stage in zip(operations, stage_of):
+        stages[stage].append(operation)
+    return stages
+
+
+def apply_plan(
+    plan: RenamePlan,
+    operation: Callable[[str, str], None] = rename_no_clobber,
+    workers: int = c.PLAN_WORKERS,
+    on_move: Optional[Callable[[Move, Optional[BaseException]], None]] = None,
+    on_stage: Optional[Callable[[int], None]] = None,
+    on_retarget: Optional[Callable[[Move, Move], None]] = None
+) -> List[Tuple[Move, BaseException]]:
+    """Run a plan stage by stage, each stage's moves on up to workers threads.
+
+    Nothing is checked up front: operation refuses to replace a file.
+    When another process took a file's final name after planning, the
+    name is recorded in plan.registry and the next "name (n)" is tried,
+    PLACE_MAX_ATTEMPTS names at most, as copy_files does; plan.targets
+    follows. on_retarget gets the move and its replacement before the
+    retry runs. Any other failed move fails on its own (as do the moves
+    that wait for it) without touching anything. Returns the failed
+    moves; on_move is called after every move as it was last tried,
+    with its error, if any, and on_stage with a stage's index once all
+    of its moves are done. The registry is only touched by the calling
+    thread.
+    """
+    failures: List[Tuple[Move, BaseException]] = []
+    # Final name -> source, and the name each source asked for
+    owner = {final: old for old, final in plan.targets.items()}
+    wanted = {old: new for old, new, _ in plan.conflicts}
+
+    def retarget(move: Move) -> Move:
+        old = owner.pop(move.dst)
+        plan.registry.add(move.dst)
+        name, ext = os.path.splitext(wanted.setdefault(old, move.dst))
+        retry = Move(move.src, plan.registry.allocate(name, ext))
+        owner[retry.dst] = old
+        plan.targets[old] = retry.dst
+        if on_retarget is not None:
+            on_retarget(move, retry)
+        return retry
+
+    def run(move: Move) -> Optional[BaseException]:
+        try:
+            operation(
+                os.path.join(plan.directory, move.src),
+                os.path.join(plan.directory, move.dst),
+            )
+            return None
+        except OSError as e:
+            return e
+
+    executor = ThreadPoolExecutor(workers) if workers > 1 else None
+    try:
+        for index, stage in enumerate(plan.stages):
+            attempt = 1
+            while stage:
+                if executor is not None and len(stage) > 1:
+                    results = executor.map(run, stage)
+                else:
+                    results = map(run, stage)
+                retries = []
+                for move, error in zip(stage, results):
+                    if (isinstance(error, FileExistsError) and attempt < c.PLACE_MAX_ATTEMPTS
+                            and plan.registry is not None and move.dst in owner):
+                        retries.append(retarget(move))
+                        continue
+                    if error is not None:
+                        failures.append((move, error))
+                    if on_move is not None:
+                        on_move(move, error)
+                stage = retries
+                attempt += 1
+            if on_stage is not None:
+                on_stage(index)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return failures
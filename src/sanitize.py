@@ -0,0 +1,99 @@
+"""Turn arbitrary text into a file name that every supported file system accepts."""
+
+import unicodedata
+
+from . import constants as c
+
+# Everything replaced or removed is ASCII, and UTF-8 never uses ASCII bytes
+# inside a multi-byte character, so the tables work on the encoded bytes.
+# (str.translate looks every character up in a dict, which is far slower
+# for Vietnamese text.)
+_CONTROL_BYTES = bytes([*range(32), 0x7f])
+# Control characters become spaces (they are mostly line breaks and tabs)
+_TO_SPACE = bytes.maketrans(_CONTROL_BYTES, b" " * len(_CONTROL_BYTES))
+# Characters Windows forbids in names are dropped
+_FORBIDDEN = b'<>:"/\\|?*'
+# Controls other than newlines and tabs
+_STRIP_CONTROLS = bytes(b for b in _CONTROL_BYTES if b not in b"\n\t")
+
+_WINDOWS_RESERVED = {
+    "CON", "PRN", "AUX", "NUL",
+    *(f"COM{i}" for i in range(1, 10)), *(f"LPT{i}" for i in range(1, 10)),
+}
+
+# Characters that belong to the grapheme before them
+_JOINING_CATEGORIES = {"Mn", "Mc", "Me"}
+_ZWJ = "\u200d"
+
+
+def _translate(text: str, table, delete: bytes) -> str:
+    data = text.encode("utf-8", "surrogatepass").translate(table, delete)
+    return data.decode("utf-8", "surrogatepass")
+
+
+def strip_controls(text: str) -> str:
+    """Drop control characters except newlines and tabs; letters of any script stay."""
+    return unicodedata.normalize("NFC", _translate(text, None, _STRIP_CONTROLS))
+
+
+def clean_name(text: str) -> str:
+    """Remove what a file name cannot hold, normalize to NFC and collapse whitespace."""
+    text = " ".join(_translate(text, _TO_SPACE, _FORBIDDEN).split())
+    return unicodedata.normalize("NFC", text)
+
+
+def _starts_grapheme(text: str, index: int) -> bool:
+    ch = text[index]
+    if unicodedata.category(ch) in _JOINING_CATEGORIES or ch == _ZWJ:
+        return False
+    return not (index and text[index - 1] == _ZWJ)
+
+
+def _cut(text: str, end: int) -> str:
+    """text[:end], moved back to the start of the grapheme end falls in."""
+    while end and not _starts_grapheme(text, end):
+        end -= 1
+    return text[:end]
+
+
+def truncate_bytes(text: str, max_bytes: int, encoding: str = "utf-8") -> str:
+    """Longest prefix of text that fits max_bytes and does not split a grapheme."""
+    encoded = text.encode(encoding)
+    if len(encoded) <= max_bytes:
+        return text
+    return _cut(text, len(encoded[:max(max_bytes, 0)].decode(encoding, "ignore")))
+
+
+def fit_name(
+    name: str,
+    ext: str = "",
+    suffix: str = "",
+    max_chars: int = c.MAX_FILENAME_LENGTH,
+    max_bytes: int = c.NAME_MAX_BYTES,
+    reserve: int = c.DUPLICATE_SUFFIX_BYTES
+) -> str:
+    """Shorten name so that name + suffix + " (n)" + ext fits the file system.
+
+    max_bytes is the UTF-8 limit on one path component (NAME_MAX, 255 on
+    Linux); reserve bytes are kept free for a duplicate counter. Returns
+    the shortened name with suffix appended.
+    """
+    budget = max_bytes - reserve - len((suffix + ext).encode("utf-8"))
+    if len(name) > max_chars:
+        name = _cut(name, max_chars)
+    name = truncate_bytes(name, budget).rstrip(" .")
+    if name.upper() in _WINDOWS_RESERVED:
+        name += "_"
+    return name + suffix
+
+
+def sanitize_filename(
+    text: str,
+    ext: str = "",
+    suffix: str = "",
+    default: str = "untitled",
+    max_chars: int = c.MAX_FILENAME_LENGTH
+) -> str:
+    """clean_name, then fit_name; default if nothing usable is left."""
+    name = clean_name(text).rstrip(" .") or default
+    return fit_name(name, ext, suffix, max_chars)
@@ -0,0 +1,189 @@
+"""Score paragraphs as title candidates, one document or a whole batch at a time."""
+
+from typing import Dict, List, Optional, Sequence
+
+from . import constants as c
+from .keywords import KeywordMatcher
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Order of the features in a row (a column of the batch matrix), and of the weights
+FEATURES = (
+    "uppercase",    # 1 if the paragraph is all caps
+    "max_font",     # 1 if it uses the document's largest font size
+    "centered",     # 1 if centered
+    "match_hits",   # match.txt entries found in it
+    "ignore_hits",  # ignore.txt entries found in it
+    "font_ratio",   # font size / the document's largest font size
+    "position",     # 0 for the first paragraph, approaching 1 for the last
+)
+
+
+def weight_vector(weights: Optional[Dict[str, float]] = None) -> List[float]:
+    """Order a {feature: weight} mapping as FEATURES; missing features weigh 0."""
+    weights = c.SCORE_WEIGHTS if weights is None else weights
+    unknown = set(weights) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown scoring features: {sorted(unknown)}")
+    return [float(weights.get(name, 0.0)) for name in FEATURES]
+
+
+def document_features(
+    paragraphs: Sequence,
+    match_matcher: KeywordMatcher,
+    ignore_matcher: KeywordMatcher
+) -> List[List[float]]:
+    """One FEATURES row per paragraph of a document."""
+    sizes = [p.font_size for p in paragraphs]
+    max_size = max((size or 0) for size in sizes) if sizes else 0
+    count = len(paragraphs)
+    rows = []
+    for index, p in enumerate(paragraphs):
+        size = sizes[index]
+        rows.append([
+            float(p.is_uppercase),
+            float(size is not None and size == max_size),
+            float(bool(p.is_centered)),
+            float(match_matcher.count(p.text)),
+            float(ignore_matcher.count(p.text)),
+            (size or 0) / max_size if max_size else 0.0,
+            index / count,
+        ])
+    return rows
+
+
+def score_document(
+    paragraphs: Sequence,
+    match_matcher: KeywordMatcher,
+    ignore_matcher: KeywordMatcher,
+    weights: Optional[Dict[str, float]] = None
+) -> List[float]:
+    """Score the paragraphs of one document."""
+    vector = weight_vector(weights)
+    return [
+        sum(w * x for w, x in zip(vector, row))
+        for row in document_features(paragraphs, match_matcher, ignore_matcher)
+    ]
+
+
+class FeatureBatch:
+    """Feature rows of many documents stacked into one matrix.
+
+    Rows of document d are matrix[offsets[d]:offsets[d + 1]].
+    """
+
+    def __init__(self, matrix, lengths):
+        self.matrix = matrix
+        self.lengths = lengths
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)))
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+
+def build_batch(
+    documents: Sequence[Sequence],
+    match_matcher: KeywordMatcher,
+    ignore_matcher: KeywordMatcher
+) -> FeatureBatch:
+    """Extract the features of every paragraph of every document.
+
+    Per-paragraph values are collected once; the columns that depend on
+    the whole document (max_font, font_ratio, position) are derived with
+    segment-wise array operations.
+    """
+    if not NUMPY_AVAILABLE:
+        raise ImportError("numpy is required for batch scoring")
+    lengths = np.fromiter((len(doc) for doc in documents), dtype=np.int64, count=len(documents))
+    total = int(lengths.sum())
+    raw = np.array([
+        (
+            p.is_uppercase,
+            p.font_size is not None,
+            p.font_size or 0,
+            bool(p.is_centered),
+            match_matcher.count(p.text),
+            ignore_matcher.count(p.text),
+        )
+        for doc in documents for p in doc
+    ], dtype=float).reshape(total, 6)
+
+    batch = FeatureBatch(np.zeros((total, len(FEATURES))), lengths)
+    if not total:
+        return batch
+    has_size, size = raw[:, 1].astype(bool), raw[:, 2]
+    doc_index = np.repeat(np.arange(len(documents)), lengths)
+    starts = batch.offsets[:-1]
+
+    doc_max = np.zeros(len(documents))
+    non_empty = lengths > 0
+    doc_max[non_empty] = np.maximum.reduceat(size, starts[non_empty])
+    row_max = doc_max[doc_index]
+
+    matrix = batch.matrix
+    matrix[:, 0] = raw[:, 0]
+    matrix[:, 1] = has_size & (size == row_max)
+    matrix[:, 2] = raw[:, 3]
+    matrix[:, 3] = raw[:, 4]
+    matrix[:, 4] = raw[:, 5]
+    np.divide(size, row_max, out=matrix[:, 5], where=row_max > 0)
+    matrix[:, 6] = (np.arange(total) - starts[doc_index]) / lengths[doc_index]
+    return batch
+
+
+class BatchScorer:
+    """Apply a weight vector to a FeatureBatch and rank each document."""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for batch scoring")
+        self.weights = np.array(weight_vector(weights))
+
+    def score(self, batch: FeatureBatch):
+        """Score of every paragraph, in batch row order."""
+        return batch.matrix @ self.weights
+
+    def top_k(self, batch: FeatureBatch, k: int = 3, scores=None):
+        """Indices (within each document) of its k best paragraphs, best first.
+
+        One row per document, padded with -1 past its last paragraph.
+        Ties go to the earlier paragraph, as with a stable sort.
+        """
+        if scores is None:
+            scores = self.score(batch)
+        lengths = batch.lengths
+        width = int(lengths.max()) if len(lengths) else 0
+        if width == 0 or k <= 0:
+            return np.full((len(lengths), 0), -1, dtype=np.int64)
+
+        # Lay the segments out as rows of a padded matrix
+        doc_index = np.repeat(np.arange(len(lengths)), lengths)
+        column = np.arange(len(scores)) - batch.offsets[:-1][doc_index]
+        padded = np.full((len(lengths), width), -np.inf)
+        padded[doc_index, column] = scores
+        valid = np.zeros((len(lengths), width), dtype=bool)
+        valid[doc_index, column] = True
+
+        kth = min(k, width)
+        # Per row, the kth best score, found by partial partitioning
+        part = np.argpartition(-padded, kth - 1, axis=1)
+        threshold = np.take_along_axis(padded, part[:, kth - 1:kth], axis=1)
+        # argpartition breaks ties arbitrarily: keep everything above the
+        # threshold and fill the remaining slots with the earliest ties
+        above = valid & (padded > threshold)
+        tied = valid & (padded == threshold)
+        slots = kth - above.sum(axis=1, keepdims=True)
+        chosen = above | (tied & (np.cumsum(tied, axis=1) <= slots))
+
+        # Order the chosen few of each document by score, then position
+        rows, columns = np.nonzero(chosen)
+        order = np.lexsort((columns, -padded[rows, columns], rows))
+        rows, columns = rows[order], columns[order]
+        starts = np.concatenate(([0], np.cumsum(chosen.sum(axis=1))[:-1]))
+        top = np.full((len(lengths), kth), -1, dtype=np.int64)
+        top[rows, np.arange(len(rows)) - starts[rows]] = columns
+        return top
@@ -0,0 +1,90 @@
+"""Parse a file once and share the result between preview and naming."""
+
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import constants as c
+from . import extraction
+from .docx_reader import Block
+
+try:
+    import win32com.client  # Word fallback for .doc files the native reader rejects
+    DOC_COM_AVAILABLE = True
+except ImportError:
+    DOC_COM_AVAILABLE = False
+
+# Bump whenever a reader changes what it extracts, so cached snapshots are dropped
+SNAPSHOT_VERSION = 3
+
+
+def make_preview(texts: Iterable[str], max_chars: int = c.MAX_CONTENT_CHARS) -> str:
+    """Join texts into a single line of at most max_chars characters."""
+    text = " ".join(
+        line.strip() for part in texts for line in part.splitlines() if line.strip()
+    )
+    if len(text) > max_chars:
+        text = text[:max_chars].strip() + "..."
+    return text
+
+
+class DocumentSnapshot:
+    """Everything the app needs from one file, produced by a single parse.
+
+    blocks are the leading blocks in body order: enough of them for
+    scoring (line_limit) and for the preview. metadata describes the file
+    the blocks were read from.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        blocks: List[Block],
+        preview: str,
+        metadata: Dict[str, Any]
+    ):
+        self.path = path
+        self.blocks = blocks
+        self.preview = preview
+        self.metadata = metadata
+
+
+def build_snapshot(
+    filepath: str,
+    line_limit: Optional[int] = None,
+    preview_chars: int = c.MAX_CONTENT_CHARS,
+    timeout: Optional[float] = None
+) -> DocumentSnapshot:
+    """Parse a file once into a DocumentSnapshot.
+
+    With a timeout the file is parsed in a disposable worker process that
+    is killed (raising ExtractionTimeout) if it runs longer than timeout
+    seconds or past its memory ceiling. Otherwise it is parsed in-process.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext not in extraction.NativeBackend.READERS:
+        raise ValueError(f"Unsupported file format: {filepath}")
+    stat = os.stat(filepath)
+
+    try:
+        if timeout is None:
+            blocks = extraction.NativeBackend().extract(filepath, line_limit, preview_chars)
+        else:
+            blocks = extraction.shared_pool().extract(
+                filepath, line_limit, preview_chars, timeout=timeout
+            )
+    except extraction.ExtractionTimeout:
+        raise
+    except Exception:
+        if ext != '.doc' or not DOC_COM_AVAILABLE:
+            raise
+        blocks = extraction.shared_pool(extraction.WordComBackend).extract(
+            filepath, line_limit, preview_chars, timeout=timeout
+        )
+
+    metadata = {
+        'extension': ext,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+    preview = make_preview((block.text for block in blocks), preview_chars)
+    return DocumentSnapshot(filepath, blocks, preview, metadata)
@@ -0,0 +1,141 @@
+"""Read the head of a plain text file in whatever encoding it was saved with."""
+
+import codecs
+import re
+import unicodedata
+from typing import Iterator, Tuple
+
+from . import constants as c
+from .docx_reader import Block
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# TCVN3 (ABC) puts Vietnamese letters in the upper half of an 8-bit table.
+# Capital toned letters live in separate "H" fonts with the same codes, so
+# they decode to lowercase and are raised again inside all-caps words.
+_TCVN3_LETTERS = {
+    0xA1: "Ă", 0xA2: "Â", 0xA3: "Ê", 0xA4: "Ô", 0xA5: "Ơ", 0xA6: "Ư", 0xA7: "Đ",
+    0xA8: "ă", 0xA9: "â", 0xAA: "ê", 0xAB: "ô", 0xAC: "ơ", 0xAD: "ư", 0xAE: "đ",
+    0xB5: "à", 0xB6: "ả", 0xB7: "ã", 0xB8: "á", 0xB9: "ạ",
+    0xBB: "ằ", 0xBC: "ẳ", 0xBD: "ẵ", 0xBE: "ắ", 0xC6: "ặ",
+    0xC7: "ầ", 0xC8: "ẩ", 0xC9: "ẫ", 0xCA: "ấ", 0xCB: "ậ",
+    0xCC: "è", 0xCE: "ẻ", 0xCF: "ẽ", 0xD0: "é", 0xD1: "ẹ",
+    0xD2: "ề", 0xD3: "ể", 0xD4: "ễ", 0xD5: "ế", 0xD6: "ệ",
+    0xD7: "ì", 0xD8: "ỉ", 0xDC: "ĩ", 0xDD: "í", 0xDE: "ị",
+    0xDF: "ò", 0xE1: "ỏ", 0xE2: "õ", 0xE3: "ó", 0xE4: "ọ",
+    0xE5: "ồ", 0xE6: "ổ", 0xE7: "ỗ", 0xE8: "ố", 0xE9: "ộ",
+    0xEA: "ờ", 0xEB: "ở", 0xEC: "ỡ", 0xED: "ớ", 0xEE: "ợ",
+    0xEF: "ù", 0xF1: "ủ", 0xF2: "ũ", 0xF3: "ú", 0xF4: "ụ",
+    0xF5: "ừ", 0xF6: "ử", 0xF7: "ữ", 0xF8: "ứ", 0xF9: "ự",
+    0xFA: "ỳ", 0xFB: "ỷ", 0xFC: "ỹ", 0xFD: "ý", 0xFE: "ỵ",
+}
+_TCVN3_TABLE = str.maketrans({chr(code): letter for code, letter in _TCVN3_LETTERS.items()})
+
+# The five Vietnamese tone marks once a letter is decomposed
+_TONE_MARKS = {"\u0300", "\u0301", "\u0303", "\u0309", "\u0323"}
+# ...and what else may follow an ASCII letter: circumflex, breve, horn
+_VIETNAMESE_MARKS = _TONE_MARKS | {"\u0302", "\u0306", "\u031b"}
+_WORD = re.compile(r"\w+")
+# Words with an ASCII capital and no ASCII lowercase letter
+_CAPS_WORD = re.compile(r"\b(?=\w*[A-Z])[^\Wa-z]+\b")
+
+# Scoring a few KB is enough to tell legacy code pages apart
+_SNIFF_BYTES = 8192
+
+
+def decode_tcvn3(data: bytes) -> str:
+    """Decode TCVN3 (ABC) bytes; codes outside the table fall back to Latin-1."""
+    text = data.decode("latin-1").translate(_TCVN3_TABLE)
+    return _CAPS_WORD.sub(lambda match: match.group().upper(), text)
+
+
+def _decode_cp1258(data: bytes) -> str:
+    # Windows-1258 stores tones as combining marks; NFC joins them to the letter
+    return unicodedata.normalize("NFC", data.decode("cp1258", "replace"))
+
+
+def _vietnamese_score(text: str) -> int:
+    """Plausible Vietnamese syllables minus implausible non-ASCII words.
+
+    A syllable carries at most one tone mark and only Vietnamese letters,
+    which a text decoded with the wrong code page rarely manages.
+    """
+    score = 0
+    for word in _WORD.findall(text):
+        if word.isascii():
+            continue
+        decomposed = unicodedata.normalize("NFD", word)
+        tones = sum(1 for ch in decomposed if ch in _TONE_MARKS)
+        letters_ok = all(
+            ch.isascii() or ch in _VIETNAMESE_MARKS or ch in "đĐ" for ch in decomposed
+        )
+        score += 1 if tones <= 1 and letters_ok else -1
+    return score
+
+
+def detect_encoding(sample: bytes, complete: bool = True) -> str:
+    """Guess the encoding of the head of a file.
+
+    Byte order marks win, then strict UTF-8 (a character cut in half at
+    the end of an incomplete sample is fine), then whichever of
+    Windows-1258 and TCVN3 reads as more plausible Vietnamese.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=complete)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    head = sample[:_SNIFF_BYTES]
+    if _vietnamese_score(decode_tcvn3(head)) > _vietnamese_score(_decode_cp1258(head)):
+        return "tcvn3"
+    return "cp1258"
+
+
+def decode_head(sample: bytes, complete: bool = True) -> Tuple[str, str]:
+    """Decode the head of a file, returning the text and the detected encoding."""
+    encoding = detect_encoding(sample, complete)
+    if encoding == "tcvn3":
+        return decode_tcvn3(sample), encoding
+    if encoding == "cp1258":
+        return _decode_cp1258(sample), encoding
+    decoder = codecs.getincrementaldecoder(encoding)("replace")
+    return decoder.decode(sample, final=complete), encoding
+
+
+def read_head(filepath: str, head_bytes: int = c.TXT_HEAD_BYTES) -> Tuple[bytes, bool]:
+    """Read at most head_bytes from a file and report whether that was all of it."""
+    with open(filepath, "rb") as f:
+        sample = f.read(head_bytes + 1)
+    return sample[:head_bytes], len(sample) <= head_bytes
+
+
+def iter_blocks(filepath: str, head_bytes: int = c.TXT_HEAD_BYTES) -> Iterator[Block]:
+    """Yield the non-empty lines from the head of a text file.
+
+    Nothing past head_bytes is read. Plain text has no font sizes, so
+    every line gets the same one; a line counts as centered when it is
+    padded to sit in the middle of the widest line.
+    """
+    sample, complete = read_head(filepath, head_bytes)
+    text, _ = decode_head(sample, complete)
+    lines = text.splitlines()
+    if not complete and lines:
+        # The last line was cut off at the head boundary
+        lines.pop()
+    lines = [line.expandtabs().rstrip() for line in lines]
+    width = max((len(line) for line in lines), default=0)
+
+    for line in lines:
+        stripped = line.lstrip()
+        if not stripped:
+            continue
+        indent = len(line) - len(stripped)
+        centered = indent > 0 and abs(2 * indent + len(stripped) - width) <= 2
+        yield Block(stripped, c.TXT_FONT_SIZE, centered)
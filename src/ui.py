@@ -1,15 +1,22 @@
 """GUI components and event handlers."""
 
 import os
-import shutil
+import queue
+import threading
 from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, filedialog, simpledialog, messagebox
-from typing import List, Optional, Callable, Dict, Set
+from typing import List, Optional, Callable, Dict
 
 from . import constants as c
 from . import file_operations as fo
 from . import core
+from .cache import shared_cache
+from .extraction import ExtractionTimeout
+from .journal import BATCH, JournalResult, RenameJournal
+from .names import NameRegistry, scan_directory
+from .copy_engine import copy_files, output_operation
+from .planner import plan_renames
 
 class FileRenamerUI:
     def __init__(self, root: tk.Tk):
@@ -36,8 +43,13 @@ class FileRenamerUI:
         self.match_keywords = []
         self.ignore_keywords = []
         
-        # Track used filenames
-        self.used_names: Set[str] = set()
+        # Track used filenames (không phân biệt hoa thường)
+        self.used_names = NameRegistry()
+        
+        # Nhật ký ghi trước của lần đổi tên gần nhất, dùng để khôi phục/hoàn tác
+        self.journal = RenameJournal()
+        
+        self.cache = shared_cache()
         
         # Initialize UI components
         self._create_instruction_frame()
@@ -53,6 +65,9 @@ class FileRenamerUI:
         except Exception as e:
             self._log_error(f"Error loading keywords: {str(e)}")
         
+        # Làm nốt lần đổi tên (hoặc hoàn tác) bị ngắt giữa chừng ở lần chạy trước
+        self._recover_journal()
+        
         # Log initial message
         self._log_info("Chương trình đã sẵn sàng")
 
@@ -190,6 +205,14 @@ class FileRenamerUI:
         )
         self.apply_btn.pack(side=tk.RIGHT, padx=5)
         
+        # Add Undo button
+        self.undo_btn = ttk.Button(
+            self.dir_frame,
+            text=c.UNDO_BTN,
+            command=self.undo_last_batch
+        )
+        self.undo_btn.pack(side=tk.RIGHT, padx=5)
+        
     def _create_files_frame(self) -> None:
         """Create frame with treeview for displaying original and new filenames."""
         self.files_frame = ttk.LabelFrame(
@@ -204,7 +227,8 @@ class FileRenamerUI:
             self.files_frame,
             columns=(
                 c.ORIGINAL_NAME_COL,
-                c.NEW_NAME_COL
+                c.NEW_NAME_COL,
+                c.STATUS_COL
             ),
             show="headings"
         )
@@ -212,9 +236,11 @@ class FileRenamerUI:
         # Configure columns
         self.tree.heading(c.ORIGINAL_NAME_COL, text=c.ORIGINAL_NAME_COL)
         self.tree.heading(c.NEW_NAME_COL, text=c.NEW_NAME_COL)
+        self.tree.heading(c.STATUS_COL, text=c.STATUS_COL)
         
         self.tree.column(c.ORIGINAL_NAME_COL, width=c.NAME_COL_WIDTH)
         self.tree.column(c.NEW_NAME_COL, width=c.NAME_COL_WIDTH)
+        self.tree.column(c.STATUS_COL, width=c.STATUS_COL_WIDTH, stretch=False)
         # Create scrollbars
         v_scrollbar = ttk.Scrollbar(
             self.files_frame,
@@ -250,7 +276,7 @@ class FileRenamerUI:
             self.dir_label.config(text=directory)
             self.files = fo.get_files_in_directory(
                 directory,
-                extensions=['.doc', '.docx'],
+                extensions=list(c.SUPPORTED_EXTENSIONS),
                 exclude_patterns=['★'],
                 limit=20
             )
@@ -259,10 +285,11 @@ class FileRenamerUI:
                 self._log_info(f"Không tìm thấy tập tin hỗ trợ trong thư mục: {directory}")
                 return
                 
-            self.used_names.clear()
+            # Một lần scandir cho cả lô thay vì stat từng tên
+            self.used_names = scan_directory(directory)
             
             # Show progress with file limit info
-            self._log_info(f"Bắt đầu tải {len(self.files)} tập tin (giới hạn 20 tập tin .doc/.docx) từ: {directory}")
+            self._log_info(f"Bắt đầu tải {len(self.files)} tập tin (giới hạn 20 tập tin) từ: {directory}")
             self.progress_bar = ttk.Progressbar(
                 self.progress_frame,
                 mode='determinate',
@@ -288,15 +315,35 @@ class FileRenamerUI:
         # Update progress bar
         self.progress_bar["value"] = index + 1
         self._log_info(f"⏳ ({index + 1}/{len(self.files)}) Đang tải: {file}")
-        result = core.rename_file_with_rules(
-            file_path,
-            self.match_keywords,
-            self.ignore_keywords,
-            line_limit=10,
-            length_limit=200
-        )
+        result = None
+        status = c.STATUS_OK
+        try:
+            core.validate_file(file_path)
+            # Unchanged files come straight from the on-disk cache; the rest are
+            # parsed in a worker that is killed if it runs too long
+            snapshot = self.cache.snapshot(
+                file_path, line_limit=10, timeout=c.EXTRACTION_TIMEOUT
+            )
+        except ExtractionTimeout as e:
+            status = c.STATUS_TIMED_OUT
+            core.log_error(file_path, f"Timed out: {e}")
+            self._log_error(c.TIMED_OUT_ERROR.format(file))
+        except Exception as e:
+            status = c.STATUS_READ_ERROR
+            core.log_error(file_path, f"Failed to read file: {e}")
+            self._log_error(c.FILE_ERROR.format(str(e)))
+        else:
+            result = core.rename_file_with_rules(
+                file_path,
+                self.match_keywords,
+                self.ignore_keywords,
+                line_limit=10,
+                length_limit=200,
+                snapshot=snapshot,
+                registry=self.used_names
+            )
         new_name = os.path.basename(result) if result else file
-        self.tree.insert("", tk.END, values=(file, new_name))
+        self.tree.insert("", tk.END, values=(file, new_name, status))
         self.root.update_idletasks()
         self.root.after(10, self._load_next_file, index + 1)
             
@@ -328,47 +375,164 @@ class FileRenamerUI:
                 for item in self.tree.get_children()
             ]
             
-            success_count = 0
-            for old_name, new_name in files_to_rename:
-                if old_name == new_name:
-                    continue
-                
-                old_path = os.path.join(self.current_directory, old_name)
-                
-                if rename_in_place:
-                    new_path = os.path.join(self.current_directory, new_name)
-                    # Handle duplicate filenames
-                    new_path = core.get_unique_filename(new_path)
-                    final_name = os.path.basename(new_path)
-                    # Rename file in place
-                    os.rename(old_path, new_path)
-                else:
-                    # Create renamed directory for copies
-                    new_dir = os.path.join(self.current_directory, c.RENAMED_FILES_DIR)
-                    if not os.path.exists(new_dir):
-                        os.makedirs(new_dir)
-                    new_path = os.path.join(new_dir, new_name)
-                    # Handle duplicate filenames
-                    new_path = core.get_unique_filename(new_path)
-                    final_name = os.path.basename(new_path)
-                    # Copy file with new name
-                    shutil.copy2(old_path, new_path)
-                
-                success_count += 1
-                operation = "✓ Đổi tên" if rename_in_place else "✓ Sao chép"
-                self._log_info(f"{operation}: {old_name} → {final_name}")
+            if not rename_in_place:
+                # Sao chép chạy nền; kết quả được báo dần qua _poll_copies
+                self._start_copies(files_to_rename)
+                return
             
+            success_count = self._rename_in_place(files_to_rename)
             if success_count > 0:
-                if rename_in_place:
-                    self._log_info(f"Đã đổi tên {success_count} tập tin thành công")
-                else:
-                    self._log_info(c.SUCCESS_MESSAGE.format(new_dir))
+                self._log_info(f"Đã đổi tên {success_count} tập tin thành công")
             else:
                 self._log_info(c.NO_CHANGES_MESSAGE)
                 
         except Exception as e:
             self._log_error(c.ERROR_MESSAGE.format(str(e)))
             
+    def _rename_in_place(self, files_to_rename: List[tuple]) -> int:
+        """Rename the whole batch as one plan; returns how many files were renamed.
+
+        The planner gives out names for the batch as a whole, so files
+        may swap names or take a name another file in the batch leaves.
+        """
+        mapping = [(str(old), str(new)) for old, new in files_to_rename]
+        plan = plan_renames(self.current_directory, mapping)
+        for old_name in plan.missing:
+            self._log_error(c.FILE_ERROR.format(f"Không tìm thấy {old_name}"))
+        # Ghi toàn bộ kế hoạch xuống đĩa trước khi đổi tên tập tin nào
+        failures = self.journal.run(plan)
+        failed = set()
+        for move, error in failures:
+            failed.update(move)
+            core.log_error(os.path.join(self.current_directory, move.src), f"Failed to rename: {error}")
+            self._log_error(c.ERROR_MESSAGE.format(f"{move.src} → {move.dst}: {error}"))
+
+        success_count = 0
+        for old_name, final_name in plan.targets.items():
+            if old_name in failed or final_name in failed:
+                continue
+            self.used_names.release(old_name)
+            self.used_names.add(final_name)
+            core.log_rename(os.path.join(self.current_directory, old_name), final_name)
+            success_count += 1
+            self._log_info(f"✓ Đổi tên: {old_name} → {final_name}")
+        return success_count
+
+    def undo_last_batch(self) -> None:
+        """Give the files of the last rename batch their old names back."""
+        if not self.journal.can_undo():
+            self._log_info(c.NOTHING_TO_UNDO)
+            return
+        if not messagebox.askyesno(
+            "Xác nhận",
+            "Bạn có chắc chắn muốn hoàn tác lần đổi tên gần nhất không?",
+            icon='warning'
+        ):
+            return
+        try:
+            result = self.journal.undo()
+        except Exception as e:
+            self._log_error(c.ERROR_MESSAGE.format(str(e)))
+            return
+        if result is None:
+            self._log_info(c.NOTHING_TO_UNDO)
+        else:
+            self._report_journal(result, c.UNDO_MESSAGE)
+
+    def _recover_journal(self) -> None:
+        """Finish a batch (or an undo) that an earlier run did not."""
+        try:
+            result = self.journal.recover()
+        except Exception as e:
+            self._log_error(c.ERROR_MESSAGE.format(str(e)))
+            return
+        if result is not None:
+            message = c.RECOVERED_BATCH_MESSAGE if result.kind == BATCH else c.RECOVERED_UNDO_MESSAGE
+            self._report_journal(result, message)
+
+    def _report_journal(self, result: JournalResult, message: str) -> None:
+        """Log an undo or recovery and refresh the taken names it changed."""
+        for move, error in result.failed:
+            core.log_error(os.path.join(result.directory, move.src), f"Failed to rename: {error}")
+            self._log_error(c.ERROR_MESSAGE.format(f"{move.src} → {move.dst}: {error}"))
+        for move in result.moved:
+            core.log_rename(os.path.join(result.directory, move.src), move.dst)
+        # Tên tạm (khi đổi chéo tên) chỉ là bước trung gian, không tính là một tập tin
+        count = sum(1 for move in result.moved if not move.dst.startswith(c.PLAN_TEMP_PREFIX))
+        self._log_info(message.format(count, result.directory))
+        if self.current_directory and os.path.abspath(self.current_directory) == result.directory:
+            self.used_names = scan_directory(self.current_directory)
+
+    def _start_copies(self, files_to_rename: List[tuple]) -> None:
+        """Copy the batch into renamed_files on background threads."""
+        new_dir = os.path.join(self.current_directory, c.RENAMED_FILES_DIR)
+        pairs = [(str(old), str(new)) for old, new in files_to_rename if old != new]
+        if not pairs:
+            self._log_info(c.NO_CHANGES_MESSAGE)
+            return
+        
+        # Create renamed directory for copies; một lần quét cho cả lô
+        os.makedirs(new_dir, exist_ok=True)
+        copy_names = scan_directory(new_dir)
+        items = [
+            (os.path.join(self.current_directory, old), copy_names.allocate(*os.path.splitext(new)))
+            for old, new in pairs
+        ]
+        
+        # Liên kết cứng/reflink khi hệ thống tập tin hỗ trợ, nếu không thì sao chép
+        operation = output_operation(c.OUTPUT_MODE)
+        
+        self.apply_btn.state(["disabled"])
+        self.progress_bar = ttk.Progressbar(
+            self.progress_frame,
+            mode='determinate',
+            maximum=len(items)
+        )
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
+        # Tk chỉ được gọi từ luồng chính, nên luồng sao chép gửi kết quả qua hàng đợi
+        events: "queue.Queue" = queue.Queue()
+        
+        def run() -> None:
+            try:
+                copy_files(
+                    items, new_dir, copy_names,
+                    on_progress=lambda result, done, total: events.put((result, done)),
+                    operation=operation
+                )
+            finally:
+                events.put(None)
+        
+        threading.Thread(target=run, name="copy-batch", daemon=True).start()
+        self._poll_copies(events, new_dir, 0)
+
+    def _poll_copies(self, events: "queue.Queue", new_dir: str, success_count: int) -> None:
+        """Log finished copies and move the progress bar, until the batch ends."""
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                self.root.after(c.COPY_POLL_MS, self._poll_copies, events, new_dir, success_count)
+                return
+            if event is None:
+                break
+            result, done = event
+            self.progress_bar["value"] = done
+            old_name = os.path.basename(result.src)
+            if result.error is None:
+                success_count += 1
+                self._log_info(f"✓ Sao chép: {old_name} → {result.filename}")
+            else:
+                core.log_error(result.src, f"Failed to copy: {result.error}")
+                self._log_error(c.ERROR_MESSAGE.format(f"{old_name}: {result.error}"))
+        
+        self.progress_bar.pack_forget()
+        self.apply_btn.state(["!disabled"])
+        if success_count > 0:
+            self._log_info(c.SUCCESS_MESSAGE.format(new_dir))
+        else:
+            self._log_info(c.NO_CHANGES_MESSAGE)
+
     def _validate_directory(self) -> bool:
         """Validate if directory is selected."""
         if not self.current_directory:
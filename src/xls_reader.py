@@ -0,0 +1,77 @@
+"""Read the first rows of a legacy .xls workbook."""
+
+from typing import Iterator, Set, Tuple
+
+from . import constants as c
+from .docx_reader import Block
+from .xlsx_reader import cell_text
+
+try:
+    import xlrd
+    XLS_AVAILABLE = True
+except ImportError:
+    XLS_AVAILABLE = False
+
+# XF horizontal alignment codes: centred, centred across selection
+CENTERED_ALIGNMENTS = {2, 6}
+
+
+def _merged_titles(sheet) -> Set[Tuple[int, int]]:
+    """Top-left corners of ranges merged across more than one column."""
+    return {
+        (rlo, clo)
+        for rlo, _rhi, clo, chi in sheet.merged_cells
+        if chi - clo > 1
+    }
+
+
+def _cell_text(book, cell) -> str:
+    if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return ""
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        try:
+            return xlrd.xldate_as_datetime(cell.value, book.datemode).strftime("%d/%m/%Y")
+        except (ValueError, OverflowError, xlrd.xldate.XLDateError):
+            pass
+    return cell_text(cell.value)
+
+
+def iter_blocks(filepath: str, max_rows: int = c.SHEET_MAX_ROWS) -> Iterator[Block]:
+    """Yield the non-empty cells of the first max_rows non-empty rows of the first sheet.
+
+    Only the first sheet is loaded, and it is unloaded again before the
+    workbook's resources are released.
+    """
+    if not XLS_AVAILABLE:
+        raise ImportError("xlrd is required to read .xls files")
+    book = xlrd.open_workbook(filepath, on_demand=True, formatting_info=True)
+    try:
+        if not book.nsheets:
+            return
+        sheet = book.sheet_by_index(0)
+        try:
+            titles = _merged_titles(sheet)
+            rows = 0
+            for r in range(sheet.nrows):
+                found = False
+                for col, cell in enumerate(sheet.row(r)):
+                    text = _cell_text(book, cell)
+                    if not text:
+                        continue
+                    found = True
+                    xf = book.xf_list[cell.xf_index]
+                    # Font heights are stored in twentieths of a point
+                    font_size = book.font_list[xf.font_index].height / 20
+                    yield Block(
+                        text,
+                        font_size,
+                        (r, col) in titles or xf.alignment.hor_align in CENTERED_ALIGNMENTS,
+                    )
+                if found:
+                    rows += 1
+                    if rows >= max_rows:
+                        break
+        finally:
+            book.unload_sheet(0)
+    finally:
+        book.release_resources()
@@ -0,0 +1,59 @@
+"""Stream the first rows of an .xlsx workbook."""
+
+from typing import Iterator
+
+from . import constants as c
+from .docx_reader import Block
+
+try:
+    import openpyxl
+    XLSX_AVAILABLE = True
+except ImportError:
+    XLSX_AVAILABLE = False
+
+# "Merge & Center" titles and "Center Across Selection" both end up here
+CENTERED_ALIGNMENTS = {"center", "centerContinuous"}
+
+
+def cell_text(value) -> str:
+    """Format a cell value the way it reads in a filename."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def iter_blocks(filepath: str, max_rows: int = c.SHEET_MAX_ROWS) -> Iterator[Block]:
+    """Yield the non-empty cells of the first max_rows non-empty rows of the active sheet.
+
+    The workbook is opened read-only, so rows are parsed as they are
+    reached and the rest of the sheet is never loaded. Merge ranges are
+    stored after the cell data, so centering comes from cell alignment.
+    """
+    if not XLSX_AVAILABLE:
+        raise ImportError("openpyxl is required to read .xlsx files")
+    workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = 0
+        for row in sheet.iter_rows():
+            found = False
+            for cell in row:
+                if cell.value is None:
+                    continue
+                text = cell_text(cell.value)
+                if not text:
+                    continue
+                found = True
+                font_size = cell.font.sz if cell.font is not None else None
+                horizontal = cell.alignment.horizontal if cell.alignment is not None else None
+                yield Block(
+                    text,
+                    float(font_size or c.SHEET_DEFAULT_FONT_SIZE),
+                    horizontal in CENTERED_ALIGNMENTS,
+                )
+            if found:
+                rows += 1
+                if rows >= max_rows:
+                    break
+    finally:
+        workbook.close()
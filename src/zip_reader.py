@@ -0,0 +1,261 @@
+"""Read individual members of a zip package without inflating the rest."""
+
+import io
+import mmap
+import struct
+import zlib
+from typing import Dict, List, NamedTuple
+
+from . import constants as c
+
+EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+ZIP64_EOCD_SIGNATURE = b"PK\x06\x06"
+CENTRAL_SIGNATURE = b"PK\x01\x02"
+LOCAL_SIGNATURE = b"PK\x03\x04"
+
+EOCD_SIZE = 22
+ZIP64_LOCATOR_SIZE = 20
+CENTRAL_HEADER_SIZE = 46
+LOCAL_HEADER_SIZE = 30
+MAX_COMMENT_SIZE = 0xFFFF
+ZIP64_EXTRA_ID = 0x0001
+
+# Compression methods
+STORED = 0
+DEFLATED = 8
+
+# General purpose flags
+FLAG_ENCRYPTED = 0x0001
+FLAG_UTF8 = 0x0800
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class ZipError(ValueError):
+    """Raised for malformed, unsupported or suspicious archives."""
+
+
+class ZipMember(NamedTuple):
+    """Central directory record of one member."""
+    name: str
+    method: int
+    flags: int
+    crc: int
+    compressed_size: int
+    size: int
+    header_offset: int
+
+
+class MemberStream(io.RawIOBase):
+    """Inflate one member on demand, enforcing size and ratio limits."""
+
+    def __init__(
+        self,
+        buffer: mmap.mmap,
+        member: ZipMember,
+        offset: int,
+        max_size: int,
+        max_ratio: float
+    ):
+        super().__init__()
+        self._buffer = buffer
+        self._member = member
+        self._position = offset
+        self._end = offset + member.compressed_size
+        self._max_size = max_size
+        self._max_ratio = max_ratio
+        self._inflater = zlib.decompressobj(-zlib.MAX_WBITS) if member.method == DEFLATED else None
+        self._produced = 0
+        self._crc = 0
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _check_limits(self) -> None:
+        name = self._member.name
+        if self._produced > self._member.size or self._produced > self._max_size:
+            raise ZipError(f"Member {name} inflates past its size limit")
+        consumed = self._position - (self._end - self._member.compressed_size)
+        if (
+            self._produced > c.ZIP_RATIO_MIN_BYTES
+            and self._produced > self._max_ratio * max(consumed, 1)
+        ):
+            raise ZipError(f"Member {name} has a suspicious compression ratio")
+
+    def _fill(self, size: int) -> bytes:
+        """Produce up to size more bytes of member data."""
+        if self._inflater is None:
+            take = min(size, self._end - self._position)
+            data = self._buffer[self._position:self._position + take]
+            self._position += take
+            return data
+        data = b""
+        while not data and not self._inflater.eof:
+            tail = self._inflater.unconsumed_tail
+            if not tail:
+                if self._position >= self._end:
+                    break
+                take = min(_CHUNK_SIZE, self._end - self._position)
+                tail = self._buffer[self._position:self._position + take]
+                self._position += take
+            # max_length bounds memory however well the input compresses
+            data = self._inflater.decompress(tail, size)
+        return data
+
+    def readinto(self, b) -> int:
+        if self._eof or not len(b):
+            return 0
+        data = self._fill(len(b))
+        if not data:
+            self._eof = True
+            if self._produced != self._member.size or self._crc != self._member.crc:
+                raise ZipError(f"Member {self._member.name} is corrupt")
+            return 0
+        self._produced += len(data)
+        self._crc = zlib.crc32(data, self._crc)
+        self._check_limits()
+        b[:len(data)] = data
+        return len(data)
+
+
+class ZipArchive:
+    """Memory-mapped zip file whose central directory is parsed once.
+
+    Only the members that are opened are ever inflated. Members larger
+    than max_member_size, or that inflate more than max_ratio times their
+    compressed size, raise ZipError instead of exhausting memory.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        max_member_size: int = c.ZIP_MAX_MEMBER_SIZE,
+        max_ratio: float = c.ZIP_MAX_RATIO
+    ):
+        self.max_member_size = max_member_size
+        self.max_ratio = max_ratio
+        self._file = open(filepath, "rb")
+        try:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ZipError(f"Empty file: {filepath}")
+        try:
+            self._members = self._read_directory(filepath)
+        except (struct.error, IndexError) as e:
+            self.close()
+            raise ZipError(f"Malformed zip directory in {filepath}: {e}")
+        except Exception:
+            self.close()
+            raise
+
+    def _find_directory(self, filepath: str):
+        """Locate the central directory, returning (offset, size, entries)."""
+        buffer = self._buffer
+        search_from = max(0, len(buffer) - EOCD_SIZE - MAX_COMMENT_SIZE)
+        eocd = buffer.rfind(EOCD_SIGNATURE, search_from)
+        if eocd < 0:
+            raise ZipError(f"Not a zip file: {filepath}")
+        entries, size, offset = struct.unpack_from("<2xHII", buffer, eocd + 8)
+
+        locator = eocd - ZIP64_LOCATOR_SIZE
+        if locator >= 0 and buffer[locator:locator + 4] == ZIP64_LOCATOR_SIGNATURE:
+            record = struct.unpack_from("<Q", buffer, locator + 8)[0]
+            if buffer[record:record + 4] != ZIP64_EOCD_SIGNATURE:
+                raise ZipError(f"Broken zip64 directory in {filepath}")
+            entries, size, offset = struct.unpack_from("<QQQ", buffer, record + 32)
+        if offset + size > len(buffer):
+            raise ZipError(f"Truncated zip file: {filepath}")
+        return offset, size, entries
+
+    @staticmethod
+    def _zip64_values(extra: bytes, wanted: List[bool]) -> List[int]:
+        """Read the 64-bit fields that replace 0xFFFFFFFF placeholders."""
+        values = []
+        pos = 0
+        while pos + 4 <= len(extra):
+            header_id, length = struct.unpack_from("<HH", extra, pos)
+            if header_id == ZIP64_EXTRA_ID:
+                field = pos + 4
+                for needed in wanted:
+                    if needed:
+                        values.append(struct.unpack_from("<Q", extra, field)[0])
+                        field += 8
+                return values
+            pos += 4 + length
+        raise ZipError("Missing zip64 extra field")
+
+    def _read_directory(self, filepath: str) -> Dict[str, ZipMember]:
+        offset, size, entries = self._find_directory(filepath)
+        members: Dict[str, ZipMember] = {}
+        pos = offset
+        end = offset + size
+        for _ in range(entries):
+            if pos + CENTRAL_HEADER_SIZE > end or self._buffer[pos:pos + 4] != CENTRAL_SIGNATURE:
+                raise ZipError(f"Corrupt central directory in {filepath}")
+            (flags, method, crc, compressed_size, file_size,
+             name_len, extra_len, comment_len, header_offset) = struct.unpack_from(
+                "<4x4xHH4xIIIHHH8xI", self._buffer, pos
+            )
+            name_start = pos + CENTRAL_HEADER_SIZE
+            raw_name = self._buffer[name_start:name_start + name_len]
+            extra = self._buffer[name_start + name_len:name_start + name_len + extra_len]
+            pos = name_start + name_len + extra_len + comment_len
+
+            wanted = [file_size == 0xFFFFFFFF, compressed_size == 0xFFFFFFFF,
+                      header_offset == 0xFFFFFFFF]
+            if any(wanted):
+                values = iter(self._zip64_values(extra, wanted))
+                if wanted[0]:
+                    file_size = next(values)
+                if wanted[1]:
+                    compressed_size = next(values)
+                if wanted[2]:
+                    header_offset = next(values)
+
+            name = raw_name.decode("utf-8" if flags & FLAG_UTF8 else "cp437", "replace")
+            members[name] = ZipMember(
+                name, method, flags, crc, compressed_size, file_size, header_offset
+            )
+        return members
+
+    def namelist(self) -> List[str]:
+        return list(self._members)
+
+    def open(self, name: str) -> MemberStream:
+        """Open a member as a stream. Raises KeyError if it does not exist."""
+        member = self._members[name]
+        if member.flags & FLAG_ENCRYPTED:
+            raise ZipError(f"Member {name} is encrypted")
+        if member.method not in (STORED, DEFLATED):
+            raise ZipError(f"Member {name} uses unsupported compression {member.method}")
+        if member.size > self.max_member_size:
+            raise ZipError(f"Member {name} is too large ({member.size} bytes)")
+
+        header = member.header_offset
+        if self._buffer[header:header + 4] != LOCAL_SIGNATURE:
+            raise ZipError(f"Bad local header for {name}")
+        name_len, extra_len = struct.unpack_from("<HH", self._buffer, header + 26)
+        data_offset = header + LOCAL_HEADER_SIZE + name_len + extra_len
+        if data_offset + member.compressed_size > len(self._buffer):
+            raise ZipError(f"Member {name} runs past the end of the file")
+        return MemberStream(
+            self._buffer, member, data_offset, self.max_member_size, self.max_ratio
+        )
+
+    def read(self, name: str) -> bytes:
+        """Read a whole member. Raises KeyError if it does not exist."""
+        with self.open(name) as stream:
+            return stream.read()
+
+    def close(self) -> None:
+        self._buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> "ZipArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,143 @@
+"""A batch or an undo cut short at any move is finished by recover()."""
+
+import itertools
+import os
+from contextlib import contextmanager
+from unittest import mock
+
+import pytest
+
+from src import journal
+from src.journal import RenameJournal
+from src.planner import apply_plan, plan_renames
+from src.placement import rename_no_clobber
+
+FILES = ["a.pdf", "b.pdf", "c.pdf", "d.pdf", "e.pdf"]
+# A swap, a chain onto a free name and a case-only rename
+MAPPING = [
+    ("a.pdf", "b.pdf"), ("b.pdf", "a.pdf"),
+    ("c.pdf", "x.pdf"), ("d.pdf", "c.pdf"),
+    ("e.pdf", "E.pdf"),
+]
+
+
+class Crash(Exception):
+    """Stands in for the process dying."""
+
+
+def make_folder(root, name):
+    directory = os.path.join(root, name)
+    os.makedirs(directory)
+    for filename in FILES:
+        with open(os.path.join(directory, filename), "w") as f:
+            f.write(filename)
+    return directory
+
+
+def contents(directory):
+    result = {}
+    for filename in os.listdir(directory):
+        with open(os.path.join(directory, filename)) as f:
+            result[filename] = f.read()
+    return result
+
+
+@contextmanager
+def crashing(path, step, torn, lose_tail):
+    """Kill the next plan the journal runs at its move number `step`.
+
+    torn dies between the link and the unlink of the old rename; lose_tail
+    drops what the journal wrote after its last fsync, leaving a torn record.
+    """
+    moves = [0]
+    synced = [0]
+    crashed = []
+    real_sync = RenameJournal._sync
+
+    def operation(src, dst):
+        if moves[0] == step:
+            if torn:
+                os.link(src, dst)
+            raise Crash()
+        moves[0] += 1
+        rename_no_clobber(src, dst)
+
+    def sync(self, *args):
+        real_sync(self, *args)
+        synced[0] = os.path.getsize(path)
+
+    def run_plan(plan, workers, **kwargs):
+        return apply_plan(plan, operation=operation, workers=1, **kwargs)
+
+    with mock.patch.object(journal, "apply_plan", run_plan), \
+            mock.patch.object(RenameJournal, "_sync", sync):
+        try:
+            yield crashed
+        except Crash:
+            crashed.append(step)
+    if crashed and lose_tail:
+        with open(path, "r+b") as f:
+            f.truncate(min(os.path.getsize(path), synced[0] + 1))
+
+
+@pytest.mark.parametrize("torn", [False, True])
+@pytest.mark.parametrize("lose_tail", [False, True])
+def test_batch_cut_short_is_finished_then_undone(tmp_path, torn, lose_tail):
+    for step in itertools.count():
+        directory = make_folder(str(tmp_path), f"batch{step}")
+        path = os.path.join(str(tmp_path), f"batch{step}.jsonl")
+        before = contents(directory)
+        plan = plan_renames(directory, MAPPING)
+        after = {plan.targets.get(name, name): text for name, text in before.items()}
+
+        with crashing(path, step, torn, lose_tail) as crashed:
+            RenameJournal(path).run(plan)
+        result = RenameJournal(path).recover()
+        assert (result is not None) == bool(crashed)
+        assert result is None or not result.failed
+        assert contents(directory) == after
+        assert RenameJournal(path).recover() is None
+
+        assert RenameJournal(path).undo() is not None
+        assert contents(directory) == before
+        if not crashed:
+            break
+
+
+@pytest.mark.parametrize("torn", [False, True])
+@pytest.mark.parametrize("lose_tail", [False, True])
+def test_undo_cut_short_is_finished(tmp_path, torn, lose_tail):
+    for step in itertools.count():
+        directory = make_folder(str(tmp_path), f"undo{step}")
+        path = os.path.join(str(tmp_path), f"undo{step}.jsonl")
+        before = contents(directory)
+        assert not RenameJournal(path).run(plan_renames(directory, MAPPING))
+
+        with crashing(path, step, torn, lose_tail) as crashed:
+            RenameJournal(path).undo()
+        result = RenameJournal(path).recover()
+        assert (result is not None) == bool(crashed)
+        assert contents(directory) == before
+        assert not RenameJournal(path).can_undo()
+        if not crashed:
+            break
+
+
+def test_retried_name_is_journaled_and_undone(tmp_path):
+    directory = make_folder(str(tmp_path), "retry")
+    path = os.path.join(str(tmp_path), "retry.jsonl")
+    plan = plan_renames(directory, MAPPING)
+    with open(os.path.join(directory, "x.pdf"), "w") as f:
+        f.write("other")
+    assert not RenameJournal(path).run(plan)
+    assert plan.targets["c.pdf"] == "x (1).pdf"
+    assert contents(directory)["x (1).pdf"] == "c.pdf"
+
+    assert RenameJournal(path).undo() is not None
+    assert contents(directory) == dict({name: name for name in FILES}, **{"x.pdf": "other"})
+
+
+def test_nothing_to_recover_or_undo(tmp_path):
+    path = os.path.join(str(tmp_path), "journal.jsonl")
+    assert RenameJournal(path).recover() is None
+    assert RenameJournal(path).undo() is None
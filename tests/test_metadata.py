@@ -0,0 +1,52 @@
+"""Document number, issue date, type and the year a file name gets."""
+
+from src.metadata import Found, extract_metadata
+
+
+def year_of(*texts):
+    found = extract_metadata(texts).year
+    return found.value if found else None
+
+
+def test_fields_and_positions():
+    metadata = extract_metadata([
+        "BỘ TÀI CHÍNH",
+        "Số: 173/2014/TT-BTC",
+        "Hà Nội, ngày 14 tháng 11 năm 2014",
+        "THÔNG TƯ",
+    ])
+    assert metadata.number == Found("173/2014/TT-BTC", 1, 4)
+    assert metadata.date == Found("14/11/2014", 2, 8)
+    assert metadata.year == Found("2014", 2, 29)
+    assert metadata.doc_type == Found("THÔNG TƯ", 3, 0)
+
+
+def test_issue_date_wins():
+    assert year_of("Số: 173/2014/TT-BTC", "Hà Nội, ngày 14 tháng 11 năm 2015") == "2015"
+    assert year_of("Lạng Sơn, ngày 05.04.2021", "năm 2019") == "2021"
+    assert extract_metadata(["ngày 31.02.2021"]).date is None
+
+
+def test_other_dates():
+    # An ID card's date is not the document's
+    assert year_of("VĂN BẢN CAM KẾT", "Số CMND: 363706231  Ngày cấp: 17/10/2008") is None
+    assert year_of("Sinh ngày: 01/01/1990") is None
+    # A standing year comes first, a date in a table is the last resort
+    assert year_of("Hạn nộp 30/06/2019", "Kế hoạch năm 2020") == "2020"
+    assert year_of("BÁO CÁO", "Ngày", "04/04/2014") == "2014"
+    assert extract_metadata(["04/04/2014"]).date is None
+
+
+def test_number_needs_a_document_number_shape():
+    assert year_of("Cv số: 09/SKKB-2019") == "2019"
+    assert year_of("Số: 01 QCLĐ/KB/2020", "năm 2018") == "2020"
+    assert year_of("Thông tư số 164/2013/TT-BTC") == "2013"
+    assert year_of("Địa chỉ: Số 2008 Đường Lê Lợi", "năm 2016") == "2016"
+    assert extract_metadata(["Công văn số 09.SKKB"]).number.value == "09.SKKB"
+
+
+def test_bare_number_only_in_the_header():
+    assert year_of("Số 2009") == "2009"
+    body = ["Dòng"] * 10 + ["Số 2009"]
+    assert year_of(*body) is None
+    assert extract_metadata(body).number is None
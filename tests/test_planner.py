@@ -0,0 +1,102 @@
+"""Whole-batch renames: chains, cycles, taken names and moves that fail midway."""
+
+import os
+import random
+
+import pytest
+
+from src import constants as c
+from src.planner import apply_plan, plan_renames
+from src.placement import rename_no_clobber
+
+
+def make_folder(directory, files):
+    for filename in files:
+        with open(os.path.join(directory, filename), "w") as f:
+            f.write(filename)
+
+
+def contents(directory):
+    result = {}
+    for filename in os.listdir(directory):
+        with open(os.path.join(directory, filename)) as f:
+            result[filename] = f.read()
+    return result
+
+
+def run(directory, files, mapping, workers=4):
+    make_folder(directory, files)
+    plan = plan_renames(directory, mapping)
+    assert not apply_plan(plan, workers=workers)
+    after = contents(directory)
+    for old, final in plan.targets.items():
+        assert after[final] == old
+    assert len(after) == len(files)
+    return plan
+
+
+def test_swap_goes_through_a_temporary_name(tmp_path):
+    plan = run(str(tmp_path), ["a", "b"], [("a", "b"), ("b", "a")])
+    assert plan.targets == {"a": "b", "b": "a"}
+    assert len(plan) == 3
+
+
+def test_chain_runs_back_to_front(tmp_path):
+    plan = run(str(tmp_path), ["a", "b", "c"], [("a", "b"), ("b", "c"), ("c", "d")])
+    assert [[move.src for move in stage] for stage in plan.stages] == [["c"], ["b"], ["a"]]
+
+
+def test_case_only_rename(tmp_path):
+    plan = run(str(tmp_path), ["x.doc"], [("x.doc", "X.doc")])
+    assert plan.targets == {"x.doc": "X.doc"}
+
+
+def test_taken_name_gets_a_counter(tmp_path):
+    plan = run(str(tmp_path), ["a", "b", "keep"], [("a", "keep"), ("b", "keep")])
+    assert sorted(plan.targets.values()) == ["keep (1)", "keep (2)"]
+    assert len(plan.conflicts) == 2
+
+
+def test_random_batches(tmp_path, monkeypatch):
+    rng = random.Random(22)
+    for trial in range(200):
+        monkeypatch.setattr(c, "PLAN_MAX_STAGES", rng.choice([1, 2, 8]))
+        directory = os.path.join(str(tmp_path), str(trial))
+        os.makedirs(directory)
+        files = [f"f{i}" for i in range(rng.randint(1, 12))]
+        pool = files + [f"n{i}" for i in range(5)] + ["F1", "F2"]
+        mapping = [(f, rng.choice(pool)) for f in rng.sample(files, rng.randint(1, len(files)))]
+        run(directory, files, mapping, workers=rng.choice([1, 4]))
+
+
+@pytest.mark.parametrize("step", range(4))
+def test_failed_move_loses_no_file(tmp_path, step):
+    directory = str(tmp_path)
+    files = ["a", "b", "c"]
+    make_folder(directory, files)
+    plan = plan_renames(directory, [("a", "b"), ("b", "c"), ("c", "a")])
+    done = [0]
+
+    def operation(src, dst):
+        done[0] += 1
+        if done[0] == step + 1:
+            raise PermissionError(src)
+        rename_no_clobber(src, dst)
+
+    failures = apply_plan(plan, operation=operation, workers=1)
+    assert len(failures) >= 1
+    assert sorted(contents(directory).values()) == files
+
+
+def test_name_taken_after_planning_gets_the_next_counter(tmp_path):
+    directory = str(tmp_path)
+    make_folder(directory, ["a", "b", "c"])
+    plan = plan_renames(directory, [("a", "b"), ("b", "a"), ("c", "keep")])
+    # Another program creates the wanted names before the plan runs
+    make_folder(directory, ["keep", "keep (1)"])
+    retargeted = []
+    failures = apply_plan(plan, on_retarget=lambda move, retry: retargeted.append(retry.dst))
+    assert not failures
+    assert retargeted == ["keep (1)", "keep (2)"]
+    assert plan.targets == {"a": "b", "b": "a", "c": "keep (2)"}
+    assert contents(directory) == {"a": "b", "b": "a", "keep (2)": "c", "keep": "keep", "keep (1)": "keep (1)"}
@@ -0,0 +1,79 @@
+"""Paragraph scores and the three paragraphs a file name is built from."""
+
+import random
+
+import pytest
+
+from src import constants as c
+from src.core import TextParagraph, process_text
+from src.keywords import compile_keywords
+from src.scoring import (
+    BatchScorer, build_batch, document_features, score_document, weight_vector
+)
+
+MATCH = ("quyết định",)
+IGNORE = ("cộng hòa", "độc lập", "tự do", "hạnh phúc")
+
+
+def paragraphs(*lines):
+    return [TextParagraph(text, size, centered) for text, size, centered in lines]
+
+
+def test_largest_font_wins_over_a_smaller_uppercase_line():
+    lines = paragraphs(
+        ("SỞ TÀI CHÍNH", 18, True),
+        ("HỢP ĐỒNG", 20, True),
+        ("Nội dung", 13, False),
+    )
+    scores = score_document(lines, compile_keywords(MATCH), compile_keywords(IGNORE))
+    assert scores == [2.0, 3.0, 0.0]
+    name = process_text(lines, MATCH, IGNORE)
+    assert name == "HỢP ĐỒNG - SỞ TÀI CHÍNH - Nội dung" + c.RENAMED_MARK
+
+
+def test_keywords_add_and_subtract():
+    lines = paragraphs(
+        ("CỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM", 13, True),
+        ("QUYẾT ĐỊNH", 13, True),
+    )
+    scores = score_document(lines, compile_keywords(MATCH), compile_keywords(IGNORE))
+    assert scores == [2.5, 3.5]
+
+
+def test_features_follow_the_weight_order():
+    lines = paragraphs(("A", 10, False), ("B", 20, True))
+    rows = document_features(lines, compile_keywords(MATCH), compile_keywords(IGNORE))
+    assert rows[0] == [1.0, 0.0, 0.0, 0.0, 0.0, 0.5, 0.0]
+    assert rows[1] == [1.0, 1.0, 1.0, 0.0, 0.0, 1.0, 0.5]
+    assert weight_vector({"centered": 2}) == [0.0, 0.0, 2.0, 0.0, 0.0, 0.0, 0.0]
+
+
+def test_batch_matches_one_document_at_a_time():
+    np = pytest.importorskip("numpy")
+    rng = random.Random(15)
+    texts = ["QUYẾT ĐỊNH", "THÔNG BÁO", "Quyết định", "CỘNG HÒA", "Nội dung", "GHI CHÚ"]
+    documents = [
+        paragraphs(*[
+            (rng.choice(texts), rng.choice([None, 10, 12, 14, 20]), rng.random() < 0.5)
+            for _ in range(rng.choice([0, 1, 2, 5, 40]))
+        ])
+        for _ in range(300)
+    ]
+    match, ignore = compile_keywords(MATCH), compile_keywords(IGNORE)
+    weights = {"uppercase": 1, "max_font": 2, "centered": 1, "match_hits": 0.5,
+               "ignore_hits": -0.5, "font_ratio": 0.5, "position": -1}
+
+    batch = build_batch(documents, match, ignore)
+    scorer = BatchScorer(weights)
+    scores = scorer.score(batch)
+    expected = [score_document(doc, match, ignore, weights) for doc in documents]
+    assert np.allclose(scores, [s for doc in expected for s in doc])
+
+    # Rank the batch's own scores, so rounding cannot reorder near-ties
+    per_document = np.split(scores, batch.offsets[1:-1])
+    for k in (1, 3):
+        top = scorer.top_k(batch, k, scores)
+        assert [[i for i in row if i >= 0] for row in top.tolist()] == [
+            sorted(range(len(doc)), key=lambda i: doc[i], reverse=True)[:k]
+            for doc in per_document
+        ]